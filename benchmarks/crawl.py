@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def write_source_config(sources_dir, catalog_url, pages, concurrency):
+    """A pr_news.json copy pointed at the local server, with pagination and throttling for the run"""
+    with open(REPO_ROOT / 'config' / 'selectors' / 'sources' / 'pr_news.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    source_config = next(iter(config.values()))
+    source_config['url'] = [catalog_url]
+    source_config['selectors']['source'] = 'Bench_News'
+    source_config['headers'].pop('Accept-Encoding', None)
+    source_config['pagination'] = {'next_page': "//a[@class='next']/@href", 'max_pages': pages}
+    source_config['concurrency'] = concurrency
+    source_config['delay'] = 0
+    source_config['fetch'] = 'direct'
+
+    sources_dir.mkdir(parents=True, exist_ok=True)
+    with open(sources_dir / 'bench_news.json', 'w', encoding='utf-8') as f:
+        json.dump({'Bench News': source_config}, f, indent=4)
+
+def crawl(catalog_url, workdir, pages, concurrency):
+    """Crawl the local server with DynamicSpider from inside workdir and return the final stats"""
+    from scrapy.crawler import CrawlerProcess
+    from config.settings import get_production_settings, apply_source_throttling
+    from config.selectors.selector_manager import SelectorManager
+    from spiders.dynamic_spider import DynamicSpider
+
+    os.chdir(workdir)
+    selector_manager = SelectorManager()
+    selector_manager.selectors_dir = Path(workdir) / 'sources'
+    write_source_config(selector_manager.selectors_dir, catalog_url, pages, concurrency)
+
+    settings = get_production_settings()
+    settings.update({'LOG_LEVEL': 'WARNING', 'TELNETCONSOLE_ENABLED': False})
+    apply_source_throttling(settings, {'bench_news': selector_manager.get_source_config('bench_news')})
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(DynamicSpider)
+    process.crawl(crawler, source_name='bench_news', selector_manager=selector_manager)
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+
+    stats = crawler.stats.get_stats()
+    items = stats.get('item_scraped_count', 0)
+    return {
+        'seconds': round(elapsed, 3),
+        'items': items,
+        'items_per_sec': round(items / elapsed, 2) if elapsed > 0 else None,
+        'responses': stats.get('downloader/response_count', 0),
+        'errors': stats.get('log_count/ERROR', 0),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='One end-to-end crawl of the benchmark news server')
+    parser.add_argument('--catalog-url', required=True)
+    parser.add_argument('--workdir', required=True)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    result = crawl(args.catalog_url, args.workdir, args.pages, args.concurrency)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from scrapy.http import HtmlResponse
+from extractors.field_extractor import FieldExtractor
+from extractors.extraction_plan import ExtractionPlan
+from storage.directory_manager import DirectoryManager
+from storage.json_handler import JSONHandler
+from trackers.url_tracker import URLTracker
+from trackers.sqlite_tracker import SQLiteTracker
+from trackers.fingerprint_index import FingerprintTracker
+from utils.date_utils import DateParser
+from utils.url_utils import URLUtils
+from benchmarks.news_server import catalog_page, article_page
+
+PR_NEWS_CONFIG = Path(__file__).resolve().parent.parent / 'config' / 'selectors' / 'sources' / 'pr_news.json'
+
+DATE_SAMPLES = [
+    'Oct 17, 2024, 08:00 ET', 'October 17, 2024', '17 Oct 2024', '2024-10-17', '2024-10-17 08:00:00',
+    'Published on Oct 17, 2024 at 08:00 IST', 'Thu, 17 Oct 2024 08:00:00', '17/10/2024', '3 hours ago',
+]
+
+def load_pr_news_config():
+    with open(PR_NEWS_CONFIG, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return next(iter(config.values()))
+
+def timed(fn, *args):
+    """Run fn once and return (seconds, result)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def record(results, name, params, seconds, ops):
+    results.append({
+        'benchmark': name,
+        'params': params,
+        'seconds': round(seconds, 6),
+        'ops': ops,
+        'ops_per_sec': round(ops / seconds, 2) if seconds > 0 else None,
+    })
+
+def bench_extraction(results, entries_sizes=(10, 100, 1000), article_repeats=200):
+    """FieldExtractor.extract_field against the compiled ExtractionPlan on synthetic pages"""
+    config = load_pr_news_config()
+    selectors = config['selectors']
+    plan = ExtractionPlan(config)
+    url = 'http://127.0.0.1/news-releases/bench-latest-news/bench-latest-news-list/'
+
+    for entries in entries_sizes:
+        response = HtmlResponse(url, body=catalog_page(1, entries, 1).encode('utf-8'), encoding='utf-8')
+        fields = [name for name in selectors if name not in ('source', 'news')]
+
+        def legacy():
+            for news in response.xpath(selectors['news']):
+                for name in fields:
+                    FieldExtractor.extract_field(news, selectors, name)
+
+        def compiled():
+            for _ in plan.extract_catalog(response):
+                pass
+
+        seconds, _ = timed(legacy)
+        record(results, 'field_extractor.catalog', {'entries': entries}, seconds, entries)
+        seconds, _ = timed(compiled)
+        record(results, 'extraction_plan.catalog', {'entries': entries}, seconds, entries)
+
+    article = HtmlResponse(url, body=article_page('1-1').encode('utf-8'), encoding='utf-8')
+    news_selector = config['news_selector']
+
+    def legacy_article():
+        for _ in range(article_repeats):
+            for name in news_selector:
+                FieldExtractor.extract_field(article, news_selector, name, 'http://127.0.0.1')
+
+    def compiled_article():
+        for _ in range(article_repeats):
+            plan.extract_article(article, 'http://127.0.0.1')
+
+    seconds, _ = timed(legacy_article)
+    record(results, 'field_extractor.article', {'repeats': article_repeats}, seconds, article_repeats)
+    seconds, _ = timed(compiled_article)
+    record(results, 'extraction_plan.article', {'repeats': article_repeats}, seconds, article_repeats)
+
+def bench_parse_date(results, calls=20000, distinct=(10, 1000)):
+    """parse_date over repeated and distinct date strings"""
+    for count in distinct:
+        samples = []
+        for i in range(count):
+            day = 1 + i % 28
+            samples.append(random.choice(DATE_SAMPLES).replace('17', f'{day:02d}', 1))
+        strings = [samples[i % count] for i in range(calls)]
+
+        def run():
+            parser = DateParser()
+            for value in strings:
+                parser.parse(value, 'bench')
+
+        seconds, _ = timed(run)
+        record(results, 'parse_date', {'calls': calls, 'distinct': count}, seconds, calls)
+
+def bench_url_utils(results, count=100000):
+    """URLUtils helpers used on every catalog entry"""
+    base = 'https://www.example.com'
+    links = [f'/news-releases/category-{i % 50}/release-{i}.html' for i in range(count)]
+
+    def absolute():
+        for link in links:
+            URLUtils.get_absolute_url(base, link, 'bench')
+
+    def category():
+        for link in links:
+            URLUtils.extract_category(base + link)
+
+    def base_url():
+        for link in links:
+            URLUtils.get_base_url(base + link)
+
+    for name, fn in (('get_absolute_url', absolute), ('extract_category', category), ('get_base_url', base_url)):
+        seconds, _ = timed(fn)
+        record(results, f'url_utils.{name}', {'urls': count}, seconds, count)
+
+def make_article(i):
+    return {
+        'source': 'Bench', 'category': 'bench', 'published_date': '17/10/2024 08:00',
+        'article_date': '17/10/2024 08:00', 'title': f'Release {i}', 'author': 'Bench Corp',
+        'abstract': 'Abstract ' * 20, 'detailed_news': 'Paragraph of text. ' * 200,
+        'article_url': f'https://www.example.com/news/{i}.html', 'attachments': None, 'contacts': None,
+        'scraping_date': '2024-10-17', 'scraping_time': '08:00',
+    }
+
+def bench_json_handler(results, article_sizes=(10, 1000, 10000, 100000), max_legacy=1000):
+    """JSONHandler.safely_write_json for the jsonl log and the legacy rewrite-the-array format"""
+    for storage_format in ('jsonl', 'json'):
+        for count in article_sizes:
+            params = {'format': storage_format, 'articles': count}
+            if storage_format == 'json' and count > max_legacy:
+                results.append({'benchmark': 'json_handler.safely_write_json', 'params': params,
+                                'skipped': f'quadratic format capped at {max_legacy}'})
+                continue
+
+            with tempfile.TemporaryDirectory() as tmp:
+                dir_manager = DirectoryManager(base_dir=Path(tmp) / 'Data', tracker_dir=Path(tmp) / 'Tracker')
+                handler = JSONHandler(dir_manager, storage_format=storage_format)
+                articles = [make_article(i) for i in range(count)]
+
+                def write():
+                    for article in articles:
+                        handler.safely_write_json(article, 'Bench')
+                    handler.close()
+
+                seconds, _ = timed(write)
+                record(results, 'json_handler.safely_write_json', params, seconds, count)
+
+def make_backend(kind, tracker_dir):
+    if kind == 'fingerprint':
+        return FingerprintTracker(Path(tracker_dir) / 'fingerprints')
+    return SQLiteTracker(Path(tracker_dir) / 'url_tracker.db')
+
+def bench_trackers(results, url_sizes=(1000, 10000, 100000, 1000000), lookups=10000):
+    """URL tracker import, save, reload and lookups for each backend"""
+    for kind in ('sqlite', 'fingerprint'):
+        for count in url_sizes:
+            params = {'backend': kind, 'urls': count}
+            urls = [f'https://www.example.com/news/{i}.html' for i in range(count)]
+            with tempfile.TemporaryDirectory() as tmp:
+                # Legacy <source>_tracker.json import on first load
+                with open(Path(tmp) / 'Bench_tracker.json', 'w', encoding='utf-8') as f:
+                    json.dump(urls[:count // 2], f)
+                tracker = URLTracker(tmp, backend=make_backend(kind, tmp))
+                seconds, _ = timed(tracker.load_tracker, 'Bench')
+                record(results, 'url_tracker.import_legacy', params, seconds, count // 2)
+
+                def save():
+                    for url in urls[count // 2:]:
+                        tracker.add_url('Bench', url)
+                    tracker.save_tracker('Bench')
+
+                seconds, _ = timed(save)
+                record(results, 'url_tracker.add_and_save', params, seconds, count - count // 2)
+                tracker.close()
+
+                tracker = URLTracker(tmp, backend=make_backend(kind, tmp))
+                seconds, _ = timed(tracker.load_tracker, 'Bench')
+                record(results, 'url_tracker.load', params, seconds, 1)
+
+                probes = [random.choice(urls) for _ in range(lookups // 2)]
+                probes += [f'https://www.example.com/missing/{i}.html' for i in range(lookups // 2)]
+
+                def lookup():
+                    for url in probes:
+                        tracker.url_exists('Bench', url)
+
+                seconds, _ = timed(lookup)
+                record(results, 'url_tracker.url_exists', params, seconds, len(probes))
+                tracker.close()
+
+def run_micro(results, quick=False):
+    bench_extraction(results, entries_sizes=(10, 100) if quick else (10, 100, 1000))
+    bench_parse_date(results, calls=2000 if quick else 20000)
+    bench_url_utils(results, count=10000 if quick else 100000)
+    bench_json_handler(results, article_sizes=(10, 1000) if quick else (10, 1000, 10000, 100000))
+    bench_trackers(results, url_sizes=(1000, 10000) if quick else (1000, 10000, 100000, 1000000))
@@ -0,0 +1,104 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CATALOG_PATH = '/news-releases/bench-latest-news/bench-latest-news-list/'
+ARTICLE_PREFIX = '/news-releases/bench-article-'
+
+def catalog_page(page, entries_per_page, pages):
+    """Catalog page shaped like the pr_news.json `selectors`"""
+    cards = []
+    for i in range(entries_per_page):
+        cards.append(
+            '<div class="row newsCards">'
+            '<div class="col-sm-8 col-lg-9 pull-left card">'
+            f'<h3><small>Oct {1 + i % 28:02d}, 2024, {i % 24:02d}:{i % 60:02d} ET</small>'
+            f'Headline {page}-{i}</h3></div>'
+            f'<a class="newsreleaseconsolidatelink display-outline w-100" href="{ARTICLE_PREFIX}{page}-{i}.html">'
+            f'Headline {page}-{i}</a>'
+            f'<p class="remove-outline">Abstract for release {page}-{i}, summarising the announcement.</p>'
+            '</div>'
+        )
+    next_link = f'<a class="next" href="?page={page + 1}">Next</a>' if page < pages else ''
+    return f'<html><head><title>News</title></head><body>{"".join(cards)}{next_link}</body></html>'
+
+def article_page(article_id, paragraphs=12):
+    """Article page shaped like the pr_news.json `news_selector`"""
+    body = ''.join(
+        f'<p>Paragraph {n} of release {article_id}. The company announced results, '
+        f'outlook and commentary from management in this section.</p>'
+        for n in range(paragraphs)
+    )
+    return (
+        '<html><body>'
+        f'<div class="row detail-headline"><div><h1>Release {article_id}</h1></div></div>'
+        '<p class="mb-no">Oct 17, 2024, 08:00 ET</p>'
+        '<div class="col-lg-8 col-md-8 col-sm-7 swaping-class-left"><a>Bench Corp</a> <a>Newsroom</a></div>'
+        f'<div class="col-lg-10 col-lg-offset-1">{body}</div>'
+        '</body></html>'
+    )
+
+class NewsServer:
+    """Local stand-in for a paginated news site, run on a background thread"""
+
+    def __init__(self, pages=5, entries_per_page=25, host='127.0.0.1', port=0):
+        self.pages = pages
+        self.entries_per_page = entries_per_page
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def catalog_url(self):
+        return self.base_url + CATALOG_PATH
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == CATALOG_PATH:
+                    page = int(parse_qs(parsed.query).get('page', ['1'])[0])
+                    body = catalog_page(page, server.entries_per_page, server.pages)
+                elif parsed.path.startswith(ARTICLE_PREFIX):
+                    body = article_page(parsed.path[len(ARTICLE_PREFIX):-len('.html')])
+                else:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.micro import run_micro
+from benchmarks.news_server import NewsServer
+
+def bench_crawl(results, page_counts=(2, 10), entries_per_page=25, concurrency=16):
+    """End-to-end DynamicSpider crawls, each in a fresh process and working directory"""
+    for pages in page_counts:
+        with NewsServer(pages=pages, entries_per_page=entries_per_page) as server, \
+                tempfile.TemporaryDirectory() as workdir:
+            output = Path(workdir) / 'result.json'
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.crawl', '--catalog-url', server.catalog_url,
+                 '--workdir', workdir, '--pages', str(pages), '--concurrency', str(concurrency),
+                 '--output', str(output)],
+                cwd=REPO_ROOT, capture_output=True, text=True
+            )
+            params = {'pages': pages, 'entries_per_page': entries_per_page, 'concurrency': concurrency}
+            if completed.returncode != 0 or not output.exists():
+                results.append({'benchmark': 'crawl.end_to_end', 'params': params,
+                                'error': completed.stderr[-2000:]})
+                continue
+            with open(output, 'r', encoding='utf-8') as f:
+                crawl_result = json.load(f)
+            results.append({'benchmark': 'crawl.end_to_end', 'params': params, **crawl_result})
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes for a fast smoke run')
+    parser.add_argument('--skip-crawl', action='store_true', help='Only run the micro-benchmarks')
+    parser.add_argument('--skip-micro', action='store_true', help='Only run the end-to-end crawl')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = []
+    started = time.time()
+    if not args.skip_micro:
+        run_micro(results, quick=args.quick)
+    if not args.skip_crawl:
+        bench_crawl(results, page_counts=(2,) if args.quick else (2, 10))
+
+    output = Path(args.output) if args.output else (
+        REPO_ROOT / 'benchmarks' / 'results' / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'started_at': datetime.fromtimestamp(started).isoformat(),
+            'duration_seconds': round(time.time() - started, 3),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+            'results': results,
+        }, f, indent=4)
+
+    for result in results:
+        rate = result.get('ops_per_sec') or result.get('items_per_sec')
+        note = result.get('skipped') or result.get('error', '')[:80]
+        print(f"{result['benchmark']:<36} {json.dumps(result['params']):<48} {rate if rate is not None else note}")
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,79 @@
+import atexit
 import logging
 import logging.handlers
+import queue
+import threading
+import time
 from pathlib import Path
 import os
 
-def setup_logging(log_dir='logs', log_level=logging.INFO):
-    """Configure logging with rotation and different handlers"""
+# The listener writing queued records to the handlers, and the filter sampling them
+_listener = None
+_sampler = None
+
+def sampled(source, kind):
+    """`extra` for a per-URL message, sampled per source and kind by SampledLogFilter"""
+    return {'sample_key': (source, kind)}
+
+class SampledLogFilter(logging.Filter):
+    """Pass the first few per-URL messages of each (source, kind) per interval, count the rest
+
+    Records logged with extra=sampled(source, kind) are sampled; everything
+    else passes. Every `interval` seconds one summary line per source reports
+    how many messages of each kind were seen and how many were logged.
+    """
+
+    def __init__(self, first=5, interval=60.0):
+        super().__init__()
+        self.first = first
+        self.interval = interval
+        self.counts = {}
+        self.window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self.summary_logger = logging.getLogger('scraper.summary')
+
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if time.monotonic() - self.window_start >= self.interval:
+            self.flush()
+        if key is None:
+            return True
+        with self._lock:
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+        return count <= self.first
+
+    def flush(self):
+        """Log one summary line per source for the window that just ended"""
+        with self._lock:
+            counts, self.counts = self.counts, {}
+            elapsed = time.monotonic() - self.window_start
+            self.window_start = time.monotonic()
+        per_source = {}
+        for (source, kind), count in sorted(counts.items(), key=lambda item: str(item[0])):
+            per_source.setdefault(source, []).append(f"{kind} {count} ({min(count, self.first)} logged)")
+        for source, parts in per_source.items():
+            self.summary_logger.info(f"{source} in the last {elapsed:.0f}s: {', '.join(parts)}")
+
+def stop_logging():
+    """Write out the last summaries and drain the queue"""
+    global _listener, _sampler
+    if _sampler is not None:
+        _sampler.flush()
+        _sampler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def setup_logging(log_dir='logs', log_level=logging.INFO, sample_first=5, sample_interval=60.0):
+    """Configure logging with rotation and different handlers
+
+    The root logger only enqueues records; a QueueListener thread formats
+    them and does the console and file writes, off the reactor thread.
+    """
     # Create logs directory if it doesn't exist
     log_path = Path(log_dir)
-    log_path.mkdir(exist_ok=True)
+    log_path.mkdir(parents=True, exist_ok=True)
 
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -21,13 +87,13 @@ def setup_logging(log_dir='logs', log_level=logging.INFO):
     logger.setLevel(log_level)
 
     # Clear any existing handlers
+    stop_logging()
     logger.handlers = []
 
     # Console Handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(simple_formatter)
     console_handler.setLevel(log_level)
-    logger.addHandler(console_handler)
 
     # File Handler with rotation
     file_handler = logging.handlers.RotatingFileHandler(
@@ -38,7 +104,6 @@ def setup_logging(log_dir='logs', log_level=logging.INFO):
     )
     file_handler.setFormatter(detailed_formatter)
     file_handler.setLevel(log_level)
-    logger.addHandler(file_handler)
 
     # Error File Handler
     error_handler = logging.handlers.RotatingFileHandler(
@@ -49,7 +114,17 @@ def setup_logging(log_dir='logs', log_level=logging.INFO):
     )
     error_handler.setFormatter(detailed_formatter)
     error_handler.setLevel(logging.ERROR)
-    logger.addHandler(error_handler)
+
+    # Sampling happens before enqueueing, so dropped records cost almost nothing
+    global _listener, _sampler
+    _sampler = SampledLogFilter(first=sample_first, interval=sample_interval)
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(_sampler)
+    logger.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, console_handler, file_handler, error_handler, respect_handler_level=True
+    )
+    _listener.start()
 
     # Set up specific loggers for different components
     loggers = {
@@ -65,6 +140,8 @@ def setup_logging(log_dir='logs', log_level=logging.INFO):
 
     return loggers
 
+atexit.register(stop_logging)
+
 def get_logger(name):
     """Get a logger for a specific component"""
     return logging.getLogger(name)
@@ -1,13 +1,90 @@
+import hashlib
 import json
 import logging
+import os
+import pickle
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Bump when the bundle layout or validation rules change
+BUNDLE_VERSION = 2
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / '.cache'
+
 class SelectorManager:
-    def __init__(self):
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
         self.selectors_dir = Path(__file__).parent / 'sources'
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         self.selectors_cache = {}
+        self.plans_cache = {}
+        # Validation errors per source from the config bundle
+        self.config_errors = {}
+        self.bundle_loaded = False
+
+    def _scan_sources(self):
+        """mtime and size of every source file, the key the config bundle is valid for"""
+        files = {}
+        with os.scandir(self.selectors_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json') and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _bundle_path(self):
+        digest = hashlib.sha1(str(self.selectors_dir.resolve()).encode('utf-8')).hexdigest()[:12]
+        return self.cache_dir / f'config_bundle-{digest}.pickle'
+
+    def load_bundle(self):
+        """Load every source config from the cached bundle, rebuilding it if any file changed"""
+        if self.bundle_loaded:
+            return
+        self.bundle_loaded = True
+        files = self._scan_sources()
+
+        bundle = None
+        if self.cache_dir:
+            try:
+                with open(self._bundle_path(), 'rb') as f:
+                    bundle = pickle.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable config bundle: {e}")
+
+        if not bundle or bundle.get('version') != BUNDLE_VERSION or bundle.get('files') != files:
+            bundle = self._build_bundle(files)
+
+        self.selectors_cache.update(bundle['configs'])
+        self.config_errors.update(bundle['errors'])
+
+    def _build_bundle(self, files):
+        """Parse and validate every source file, then cache the result"""
+        configs = {}
+        errors = {}
+        for file_name in files:
+            source_name = file_name[:-len('.json')]
+            try:
+                with open(self.selectors_dir / file_name, encoding='utf-8') as f:
+                    configs[source_name] = json.load(f)
+                source_config = configs[source_name]
+                self.validate_config(source_config[next(iter(source_config))])
+            except Exception as e:
+                errors[source_name] = f"{type(e).__name__}: {e}"
+
+        bundle = {'version': BUNDLE_VERSION, 'files': files, 'configs': configs, 'errors': errors}
+        if self.cache_dir:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                bundle_path = self._bundle_path()
+                temp_path = bundle_path.with_name(f'{bundle_path.name}.{os.getpid()}.tmp')
+                with open(temp_path, 'wb') as f:
+                    pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+                temp_path.replace(bundle_path)
+                logger.debug(f"Rebuilt config bundle for {len(files)} sources")
+            except Exception as e:
+                logger.warning(f"Couldn't write config bundle: {e}")
+        return bundle
 
     def load_source_config(self, source_name):
         """Load config for a specific source"""
@@ -18,6 +95,7 @@ class SelectorManager:
             logger.error(f"Config file not found: {source_file}")
             raise FileNotFoundError(f"No config file found for {source_name}")
 
+        self.load_bundle()
         if source_name not in self.selectors_cache:
             logger.debug(f"Loading config file for {source_name}")
             try:
@@ -31,9 +109,29 @@ class SelectorManager:
 
         return self.selectors_cache[source_name]
 
+    def get_source_config(self, source_name):
+        """Get the config nested under a source file's single top-level key"""
+        source_config = self.load_source_config(source_name)
+        # Get the actual config from the first key (e.g., "PR News")
+        source_key = list(source_config.keys())[0]
+        return source_config[source_key]
+
+    def get_extraction_plan(self, source_name):
+        """Validate a source config and compile its extraction plan, once per source"""
+        if source_name not in self.plans_cache:
+            # lxml is only needed once a crawl compiles plans
+            from extractors.extraction_plan import ExtractionPlan
+
+            config = self.get_source_config(source_name)
+            if source_name in self.config_errors:
+                raise ValueError(f"Invalid config for {source_name}: {self.config_errors[source_name]}")
+            self.plans_cache[source_name] = ExtractionPlan(config)
+            logger.debug(f"Compiled extraction plan for {source_name}")
+        return self.plans_cache[source_name]
+
     def get_all_sources(self):
         """Get list of all available source names"""
-        return [f.stem for f in self.selectors_dir.glob("*.json")]
+        return [file_name[:-len('.json')] for file_name in self._scan_sources()]
 
     def load_all_configs(self):
         """Load all source configurations"""
@@ -59,9 +157,32 @@ class SelectorManager:
             missing = required_fields - set(config.keys())
             raise ValueError(f"Missing required fields: {missing}")
 
+        from extractors.feed_parser import FEED_TYPES
+        if config['type'] in FEED_TYPES:
+            # Links and dates come from the feed itself
+            required_selectors = {'source'}
+            if config.get('pagination') is not None:
+                raise ValueError(f"Pagination is not supported for {config['type']} sources")
+        elif config['type'] != 'catalog':
+            raise ValueError(f"Unknown source type {config['type']!r}, expected catalog, {' or '.join(sorted(FEED_TYPES))}")
+
         # Check selectors
         if not all(field in config['selectors'] for field in required_selectors):
             missing = required_selectors - set(config['selectors'].keys())
             raise ValueError(f"Missing required selectors: {missing}")
 
+        from middleware.fetch_policy import FETCH_POLICIES
+        if config.get('fetch', 'auto') not in FETCH_POLICIES:
+            raise ValueError(f"Unknown fetch policy {config['fetch']!r}, expected one of {sorted(FETCH_POLICIES)}")
+
+        # Check pagination
+        pagination = config.get('pagination')
+        if pagination is not None:
+            if not pagination.get('next_page') and not pagination.get('url_template'):
+                raise ValueError("Pagination needs a next_page XPath or a url_template")
+            if pagination.get('url_template') and '{page}' not in pagination['url_template']:
+                raise ValueError("Pagination url_template must contain {page}")
+            if int(pagination.get('max_pages', 1)) < 1:
+                raise ValueError("Pagination max_pages must be at least 1")
+
         return True
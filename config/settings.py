@@ -9,17 +9,123 @@ def get_settings(use_scrapingbee=False):
         'DOWNLOAD_TIMEOUT': 60,
         'RETRY_ENABLED': True,
         'RETRY_TIMES': 3,
-        'RETRY_HTTP_CODES': [500, 502, 503, 504, 400, 401, 403, 404, 408, 405],
+        # Transient and throttled statuses only; 4xx like 404 are permanent and never retried
+        'RETRY_HTTP_CODES': [500, 502, 503, 504, 408, 429, 522, 524],
+        'RETRY_THROTTLED_CODES': [429],  # wait at least Retry-After
+        'RETRY_BACKOFF_BASE': 2.0,  # seconds before the first retry, doubled each time
+        'RETRY_BACKOFF_MAX': 120,
+        'RETRY_BREAKER_THRESHOLD': 5,  # consecutive failures that pause a domain
+        'RETRY_BREAKER_COOLDOWN': 300,
+        'RETRY_BREAKER_MAX_COOLDOWN': 3600,
         'LOG_LEVEL': 'INFO',
         'LOG_FORMAT': '%(asctime)s [%(name)s] %(levelname)s: %(message)s',
         'LOG_DATEFORMAT': '%Y-%m-%d %H:%M:%S',
+        'ITEM_PIPELINES': {
+            'pipelines.storage_pipeline.StoragePipeline': 300
+        },
+        'STORAGE_FORMAT': 'jsonl',
+        'STORAGE_BATCH_SIZE': 50,
+        'STORAGE_FLUSH_INTERVAL': 2.0,
+        'STORAGE_MAX_QUEUE_SIZE': 1000,
+        'STORAGE_FSYNC_BATCH_SIZE': 50,
+        'STORAGE_FSYNC_INTERVAL': 5.0,
+        'STORAGE_MANIFEST': True,  # per-day change manifest for `run.py changes` (jsonl format only)
+        'STORAGE_SQLITE_ENABLED': False,  # also index articles in a searchable SQLite archive
+        'STORAGE_SQLITE_PATH': 'Data/articles.db',
+        'TRACKER_BACKEND': 'sqlite',  # or 'fingerprint'
+        'TRACKER_BLOOM_FILTER': False,
+        'TRACKER_MERGE_THRESHOLD': 4096,
+        'TRACKER_MERGE_RATIO': 0.1,  # merge once the delta reaches this fraction of the index
+        # One queue per download slot (= source), served least-busy first; priorities order each queue
+        'SCHEDULER_PRIORITY_QUEUE': 'scrapy.pqueues.DownloaderAwarePriorityQueue',
+        'DOWNLOADER_MIDDLEWARES': {
+            'scrapy.downloadermiddlewares.retry.RetryMiddleware': None,
+            'middleware.retry.BackoffRetryMiddleware': 550,
+            # Below HttpCompressionMiddleware so bodies are hashed decompressed
+            'middleware.catalog_cache.CatalogCacheMiddleware': 580,
+            # Between the cache and HttpCompressionMiddleware: sees decoded bodies, hides blocked ones
+            'middleware.fetch_policy.FetchPolicyMiddleware': 585,
+            # A no-op unless SCRAPINGBEE_ENABLED, so run.py can switch it on per run
+            'middleware.scrapingbee.ScrapingBeeMiddleware': 725,
+            # Close to the downloader so it sees statuses before retries
+            'middleware.source_throttle.SourceThrottleMiddleware': 900
+        },
+        'CATALOG_CACHE_FILE': 'Tracker/catalog_cache.json',
+        'CATALOG_CACHE_MAX_AGE': 24 * 3600,
+        'PAGINATION_BACKFILL': False,  # also ignores feed and sitemap watermarks
+        'FEED_WATERMARK_FILE': 'Tracker/feed_watermarks.json',
+        'FRONTIER_ENABLED': True,  # record pending requests so --resume can continue a crashed run
+        'FRONTIER_FILE': 'jobs/frontier.db',
+        'RESUME': False,
+        'DATA_TIMEZONE': 'Asia/Kolkata',  # date directories roll over at midnight here
+        'DAEMON_MODE': False,
+        'DAEMON_DEFAULT_INTERVAL': 3600,  # seconds, for sources without a schedule
+        'DAEMON_CHECKPOINT_INTERVAL': 300,  # seconds between state saves and SimHash evictions
+        'DEDUP_ENABLED': True,
+        'DEDUP_ACTION': 'tag',  # or 'drop'
+        'DEDUP_MAX_DISTANCE': 3,  # bits out of 64
+        'DEDUP_WINDOW_DAYS': 7,
+        'DEDUP_INDEX_FILE': 'Tracker/simhash_index.db',
+        'EXTENSIONS': {
+            'extensions.crawl_metrics.CrawlMetricsExtension': 500
+        },
+        'METRICS_TEXTFILE': 'logs/metrics/news_scraper.prom',
+        'METRICS_SUMMARY_FILE': 'logs/metrics/summary.json',
+        'METRICS_FLUSH_INTERVAL': 0,  # seconds; 0 writes only at close
+        'SCRAPINGBEE_FETCH_POLICY': 'auto',  # for sources without a `fetch` field
+        'SCRAPINGBEE_KEY_STATE_FILE': 'Tracker/scrapingbee_keys.json',
+        'SCRAPINGBEE_KEY_CREDITS': 1000,
+        'SCRAPINGBEE_KEY_BACKOFF': 60,
+        'SCRAPINGBEE_KEY_MAX_BACKOFF': 6 * 3600,
     }
 
-    if use_scrapingbee:
-        settings['DOWNLOADER_MIDDLEWARES'] = {
-            'middleware.scrapingbee.ScrapingBeeMiddleware': 725
-        }
+    return settings
+
+def get_download_slots(configs):
+    """Build DOWNLOAD_SLOTS from the concurrency, delay and max_rps of each source config
+
+    max_rps sets the delay to at least 1 / max_rps and turns off
+    RANDOMIZE_DOWNLOAD_DELAY for the slot, which would otherwise wait as
+    little as half the delay and allow up to twice the rate.
+    """
+    slots = {}
+    for source_name, config in configs.items():
+        slot = {}
+        adaptive = config.get('adaptive') or {}
+        concurrency = config.get('concurrency', adaptive.get('min_concurrency'))
+        if concurrency:
+            slot['concurrency'] = int(concurrency)
+
+        delay = config.get('delay')
+        if config.get('max_rps'):
+            # One request per delay is the most a slot will send
+            delay = max(delay or 0, 1.0 / float(config['max_rps']))
+            slot['randomize_delay'] = False
+        if delay is not None:
+            slot['delay'] = float(delay)
+
+        if slot:
+            slots[source_name] = slot
+    return slots
+
+def apply_source_throttling(settings, configs):
+    """Give every source its own download slot and size the global cap to the explicit per-source budgets
+
+    Sources that configure no concurrency share the environment's
+    CONCURRENT_REQUESTS as before, so it is only added to the budget when
+    at least one such source is crawled. The cap is never lowered.
+    """
+    settings['DOWNLOAD_SLOTS'] = get_download_slots(configs)
 
+    default_concurrency = settings.get('CONCURRENT_REQUESTS', 16)
+    budget = 0
+    shared = False
+    for config in configs.values():
+        adaptive = config.get('adaptive') or {}
+        concurrency = int(adaptive.get('max_concurrency') or config.get('concurrency') or 0)
+        budget += concurrency
+        shared = shared or not concurrency
+    settings['CONCURRENT_REQUESTS'] = max(default_concurrency, budget + (default_concurrency if shared else 0))
     return settings
 
 # Optional: Add custom settings for different environments
@@ -35,7 +141,7 @@ def get_development_settings():
 def get_production_settings():
     settings = get_settings()
     settings.update({
-        'CONCURRENT_REQUESTS': 5,
+        'CONCURRENT_REQUESTS': 16,
         'DOWNLOAD_DELAY': 1,
         'LOG_LEVEL': 'INFO'
     })
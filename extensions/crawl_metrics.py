@@ -0,0 +1,227 @@
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from scrapy import signals
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'news_scraper'
+# Upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+COUNTER_HELP = {
+    'catalog_pages': 'Catalog pages fetched',
+    'new_urls': 'Article URLs not seen before',
+    'skipped_urls': 'Article URLs skipped as already scraped',
+    'articles_written': 'Articles written to storage',
+    'near_duplicates': 'Articles matching a recent article by SimHash',
+    'bytes_downloaded': 'Response body bytes downloaded',
+    'proxy_credits': 'ScrapingBee credits used',
+}
+HISTOGRAM_HELP = {
+    'download_seconds': 'Download latency per response',
+    'stage_seconds': 'Time spent per processing stage',
+}
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+class CrawlMetrics:
+    """Thread-safe per-source counters and latency histograms for one crawl"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def inc(self, name, source, value=1):
+        with self._lock:
+            key = (name, source)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, source, seconds, stage=None):
+        with self._lock:
+            key = (name, source, stage)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, source, stage):
+        """Time a block into stage_seconds for a source"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', source, time.perf_counter() - start, stage)
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, help_text in COUNTER_HELP.items():
+                samples = sorted((source, value) for (key, source), value in self.counters.items() if key == name)
+                if not samples:
+                    continue
+                metric = f'{METRIC_PREFIX}_{name}_total'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} counter')
+                for source, value in samples:
+                    lines.append(f'{metric}{{source="{_escape(source)}"}} {value}')
+
+            for name, help_text in HISTOGRAM_HELP.items():
+                samples = sorted(
+                    ((source, stage), histogram) for (key, source, stage), histogram in self.histograms.items()
+                    if key == name
+                )
+                if not samples:
+                    continue
+                metric = f'{METRIC_PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (source, stage), histogram in samples:
+                    labels = f'source="{_escape(source)}"'
+                    if stage:
+                        labels += f',stage="{stage}"'
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == math.inf else repr(float(bound))
+                        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+
+            lines.append(f'# TYPE {METRIC_PREFIX}_last_update_seconds gauge')
+            lines.append(f'{METRIC_PREFIX}_last_update_seconds {time.time():.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Per-source counters and stage timings as plain JSON-friendly dicts"""
+        sources = {}
+        with self._lock:
+            for (name, source), value in self.counters.items():
+                sources.setdefault(source, {'counters': {}, 'timings': {}})['counters'][name] = value
+            for (name, source, stage), histogram in self.histograms.items():
+                key = stage or name
+                sources.setdefault(source, {'counters': {}, 'timings': {}})['timings'][key] = {
+                    'count': histogram.count,
+                    'total_seconds': round(histogram.sum, 6),
+                    'mean_seconds': round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                    'max_seconds': round(histogram.max, 6),
+                }
+        return {'started_at': self.started_at, 'finished_at': time.time(), 'sources': sources}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _atomic_write(path, text):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    temp_path.replace(path)
+
+class CrawlMetricsExtension:
+    """Export the spider's CrawlMetrics to a Prometheus textfile and a JSON summary
+
+    Download latency, bytes, catalog page counts and proxy credits are taken
+    from response_received; the spider and storage pipeline record the rest
+    on spider.metrics. Files are written at close, and every
+    METRICS_FLUSH_INTERVAL seconds when that is set.
+    """
+
+    def __init__(self, crawler, textfile, summary_file, flush_interval=0):
+        self.crawler = crawler
+        self.textfile = textfile
+        self.summary_file = summary_file
+        self.flush_interval = flush_interval
+        self.metrics = None
+        self.flush_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        extension = cls(
+            crawler,
+            textfile=settings.get('METRICS_TEXTFILE', 'logs/metrics/news_scraper.prom'),
+            summary_file=settings.get('METRICS_SUMMARY_FILE', 'logs/metrics/summary.json'),
+            flush_interval=settings.getfloat('METRICS_FLUSH_INTERVAL', 0)
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider=None):
+        spider = self.crawler.spider
+        if getattr(spider, 'metrics', None) is None:
+            spider.metrics = CrawlMetrics()
+        self.metrics = spider.metrics
+
+        if self.flush_interval > 0:
+            from twisted.internet import task
+            self.flush_loop = task.LoopingCall(self.write)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+    def source_label(self, request):
+        """The configured `source` name for a request, matching the output and tracker files"""
+        source_name = request.meta.get('source_name')
+        plan = getattr(self.crawler.spider, 'plans', {}).get(source_name)
+        return plan.source if plan is not None else (source_name or 'unknown')
+
+    def response_received(self, response, request, spider=None):
+        source = self.source_label(request)
+        self.metrics.inc('bytes_downloaded', source, len(response.body))
+        if request.meta.get('catalog'):
+            self.metrics.inc('catalog_pages', source)
+
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.metrics.observe('download_seconds', source, latency)
+
+        if request.meta.get('scrapingbee_key'):
+            try:
+                self.metrics.inc('proxy_credits', source, int(response.headers.get('Spb-cost', b'1')))
+            except ValueError:
+                self.metrics.inc('proxy_credits', source)
+
+    def spider_closed(self, spider=None):
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.write()
+
+    def write(self):
+        """Write the textfile and summary through temporary files so readers never see partial output"""
+        try:
+            _atomic_write(self.textfile, self.metrics.render_prometheus())
+            _atomic_write(self.summary_file, json.dumps(self.metrics.summary(), indent=4, sort_keys=True))
+            logger.debug(f"Wrote crawl metrics to {self.textfile} and {self.summary_file}")
+        except Exception as e:
+            logger.error(f"Error writing crawl metrics: {e}")
@@ -0,0 +1,130 @@
+import logging
+from urllib.parse import urljoin
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Namespaces parsel registers, so configured XPaths behave the same when precompiled
+XPATH_NAMESPACES = {
+    're': 'http://exslt.org/regular-expressions',
+    'set': 'http://exslt.org/sets',
+}
+
+FIRST = 'first'
+JOIN = 'join'
+LAST = 'last'
+
+# The per-field strategies FieldExtractor.extract_field applies
+FIELD_STRATEGIES = {
+    'title': FIRST,
+    'article_date': FIRST,
+    'attachment': FIRST,
+    'contact_details': FIRST,
+    'content': JOIN,
+    'author': JOIN,
+    'published_date': LAST,
+}
+
+# Keys of the catalog `selectors` block that are not per-entry fields
+CATALOG_STRUCTURE_KEYS = {'source', 'news', 'news_link'}
+
+# Depth limit for a `pagination` block that does not set max_pages
+DEFAULT_MAX_PAGES = 5
+
+def compile_xpath(expression):
+    """Compile an XPath expression, raising ValueError on bad syntax"""
+    try:
+        return etree.XPath(expression, namespaces=XPATH_NAMESPACES, smart_strings=False)
+    except etree.XPathSyntaxError as e:
+        raise ValueError(f"Invalid XPath {expression!r}: {e}")
+
+def _to_text(value):
+    """Serialize an XPath result the way parsel's .get() does"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, etree._Element):
+        return etree.tostring(value, method='html', encoding='unicode', with_tail=False)
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+class FieldPlan:
+    """One field with its compiled XPath and resolved extraction strategy"""
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+        self.xpath = compile_xpath(expression)
+        self.strategy = FIELD_STRATEGIES.get(name, FIRST)
+
+    def extract(self, node, base_url=None):
+        """Extract the field value from an lxml node"""
+        try:
+            result = self.xpath(node)
+            if not isinstance(result, list):
+                result = [result]
+
+            if self.strategy == FIRST:
+                value = _to_text(result[0]) if result else None
+                if not value:
+                    return None
+                value = value.strip()
+                if self.name == 'attachment' and base_url:
+                    value = urljoin(base_url, value)
+                return value
+
+            values = [_to_text(r) for r in result]
+            if not values:
+                return None
+            if self.strategy == JOIN:
+                return ' '.join(values).replace('\n', '').replace('\t', '').strip()
+            return values[-1].replace('\n', '').replace('\t', '').strip()
+
+        except Exception as e:
+            logger.warning(f"Error extracting {self.name}: {e}")
+            return None
+
+class ExtractionPlan:
+    """Compiled catalog and article extraction for one source configuration"""
+
+    def __init__(self, config):
+        selectors = config['selectors']
+        self.source = selectors['source']
+        # Feed and sitemap sources find their links without catalog XPaths
+        self.news = compile_xpath(selectors['news']) if selectors.get('news') else None
+        self.news_link = FieldPlan('news_link', selectors['news_link']) if selectors.get('news_link') else None
+        self.catalog_fields = [
+            FieldPlan(name, expression) for name, expression in selectors.items()
+            if name not in CATALOG_STRUCTURE_KEYS
+        ]
+        self.article_fields = [
+            FieldPlan(name, expression) for name, expression in config['news_selector'].items()
+        ]
+
+        pagination = config.get('pagination') or {}
+        self.max_pages = int(pagination.get('max_pages', DEFAULT_MAX_PAGES)) if pagination else 1
+        self.next_page = FieldPlan('next_page', pagination['next_page']) if pagination.get('next_page') else None
+        self.url_template = pagination.get('url_template')
+        self.first_page = int(pagination.get('first_page', 1))
+
+    def extract_catalog(self, response):
+        """Yield (fields, link) for every news entry on a catalog page"""
+        for node in self.news(response.selector.root):
+            fields = {field.name: field.extract(node) for field in self.catalog_fields}
+            yield fields, self.news_link.extract(node)
+
+    def next_page_url(self, response, page, catalog_url, page_url=None):
+        """URL of the catalog page after `page`, or None when pagination ends"""
+        if page >= self.max_pages:
+            return None
+        if self.next_page:
+            link = self.next_page.extract(response.selector.root)
+            return urljoin(page_url or response.url, link) if link else None
+        if self.url_template:
+            return urljoin(catalog_url, self.url_template.format(page=self.first_page + page))
+        return None
+
+    def extract_article(self, response, base_url=None):
+        """Extract every configured article field from a news page"""
+        root = response.selector.root
+        return {field.name: field.extract(root, base_url) for field in self.article_fields}
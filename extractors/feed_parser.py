@@ -0,0 +1,131 @@
+import gzip
+import io
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from lxml import etree, html
+
+logger = logging.getLogger(__name__)
+
+FEED = 'feed'
+SITEMAP = 'sitemap'
+FEED_TYPES = {FEED, SITEMAP}
+
+# Elements that hold one entry: RSS <item>, Atom <entry>, sitemap <url>, sitemap index <sitemap>
+ENTRY_TAGS = {'item', 'entry', 'url', 'sitemap'}
+# Child elements carrying the publish date, most specific first
+DATE_TAGS = ('publication_date', 'published', 'pubDate', 'date', 'updated', 'lastmod')
+
+class FeedEntry:
+    """One link discovered in a feed or sitemap"""
+
+    def __init__(self, url, published=None, abstract=None, is_sitemap=False):
+        self.url = url
+        self.published = published
+        self.abstract = abstract
+        # A child sitemap of a sitemap index rather than an article
+        self.is_sitemap = is_sitemap
+
+def parse_feed_date(value):
+    """RFC 822 (RSS) or W3C/ISO 8601 (Atom, sitemaps) date as an aware UTC datetime, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def _local_name(element):
+    tag = element.tag
+    if not isinstance(tag, str):
+        return None
+    return tag.rsplit('}', 1)[-1]
+
+def _text(element):
+    if element is None or element.text is None:
+        return None
+    return ' '.join(element.text.split()) or None
+
+def _plain_text(value):
+    """Strip the markup RSS descriptions and Atom summaries often carry"""
+    if value and '<' in value:
+        try:
+            value = ' '.join(html.fromstring(value).text_content().split())
+        except (etree.ParserError, ValueError):
+            pass
+    return value or None
+
+def _entry(element, name):
+    children = {}
+    link = None
+    for child in element.iter():
+        if child is element:
+            continue
+        child_name = _local_name(child)
+        if child_name is None:
+            continue
+        # Atom links are attributes; take the alternate (or unqualified) one
+        if child_name == 'link' and child.get('href'):
+            if link is None and child.get('rel', 'alternate') == 'alternate':
+                link = child.get('href')
+            continue
+        children.setdefault(child_name, child)
+
+    url = _text(children.get('loc')) or link or _text(children.get('link'))
+    if url is None and name == 'item':
+        # An RSS guid is the permalink unless it says otherwise
+        guid = children.get('guid')
+        if guid is not None and guid.get('isPermaLink', 'true') == 'true':
+            url = _text(guid)
+    if not url:
+        return None
+
+    published = None
+    for date_tag in DATE_TAGS:
+        published = parse_feed_date(_text(children.get(date_tag)))
+        if published:
+            break
+
+    abstract = _text(children.get('description')) or _text(children.get('summary'))
+    return FeedEntry(url, published, abstract=_plain_text(abstract), is_sitemap=name == 'sitemap')
+
+def iter_feed_entries(body):
+    """Stream the entries of an RSS, Atom, sitemap or sitemap index document
+
+    Elements are cleared as soon as they are read, so memory stays flat on
+    large sitemaps and a caller that stops iterating stops the parse too.
+    Gzipped sitemaps (.xml.gz served without Content-Encoding) are
+    decompressed on the fly.
+    """
+    stream = io.BytesIO(body)
+    if body[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+
+    parser = etree.iterparse(stream, events=('end',), resolve_entities=False, no_network=True,
+                             huge_tree=True, recover=True)
+    try:
+        for _, element in parser:
+            name = _local_name(element)
+            if name not in ENTRY_TAGS:
+                continue
+            # <url> inside an Atom or RSS entry is not a sitemap entry
+            parent = element.getparent()
+            if name in ('url', 'sitemap') and parent is not None and _local_name(parent) not in ('urlset', 'sitemapindex'):
+                continue
+
+            entry = _entry(element, name)
+            element.clear()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+            if entry:
+                yield entry
+    except (etree.XMLSyntaxError, OSError, EOFError) as e:
+        logger.warning(f"Stopped reading malformed feed: {e}")
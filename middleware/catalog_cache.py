@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from utils.file_lock import FileLock, lock_path
+
+logger = logging.getLogger(__name__)
+
+class CatalogUnchanged(IgnoreRequest):
+    """The catalog page has not changed since it was last parsed"""
+
+# Sent by the spider with url= and fields= once every article a catalog page led to has been written
+catalog_parsed = object()
+
+class CatalogValidatorStore:
+    """ETag, Last-Modified and body hash per catalog URL, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = self._read()
+        self.dirty = set()
+
+    def _read(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Couldn't load catalog cache {self.path}, starting fresh: {e}")
+            return {}
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def update(self, url, **fields):
+        self.entries.setdefault(url, {}).update(fields)
+        self.dirty.add(url)
+
+    def save(self):
+        """Merge our changed entries into the file on disk, under a lock shared with other shards"""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with FileLock(lock_path(self.path)):
+                entries = self._read()
+                for url in self.dirty:
+                    entries[url] = self.entries[url]
+                temp_path = self.path.with_suffix('.tmp')
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, indent=4)
+                temp_path.replace(self.path)
+            self.entries = entries
+            self.dirty.clear()
+            logger.info(f"Saved {len(self.entries)} catalog validators to {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving catalog cache {self.path}: {e}")
+
+class CatalogCacheMiddleware:
+    """Skip catalog pages that have not changed since the last run
+
+    Catalog requests (meta 'catalog') are sent with If-None-Match and
+    If-Modified-Since from the stored validators. A 304, or a 200 whose body
+    hashes the same as last time, is dropped with CatalogUnchanged so
+    parse_catalog never runs. Responses fetched through ScrapingBee only
+    reach the body-hash check. Validators older than max_age are ignored so
+    that every catalog is parsed in full at least that often.
+
+    A changed page's new validators ride along in meta 'catalog_validator'
+    and are only stored when the spider sends catalog_parsed, after all of
+    the page's articles have been written by StoragePipeline. A page whose
+    articles failed or were cut short by a crash is parsed again on the
+    next run.
+    """
+
+    def __init__(self, store, stats, max_age=86400, save_interval=0):
+        self.store = store
+        self.stats = stats
+        self.max_age = max_age
+        self.save_interval = save_interval
+        self.save_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        middleware = cls(
+            store=CatalogValidatorStore(settings.get('CATALOG_CACHE_FILE', 'Tracker/catalog_cache.json')),
+            stats=crawler.stats,
+            max_age=settings.getfloat('CATALOG_CACHE_MAX_AGE', 86400),
+            save_interval=settings.getfloat('DAEMON_CHECKPOINT_INTERVAL', 300) if settings.getbool('DAEMON_MODE') else 0
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.catalog_parsed, signal=catalog_parsed)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def _fresh_entry(self, url):
+        entry = self.store.get(url)
+        if entry and time.time() - entry.get('parsed_at', 0) < self.max_age:
+            return entry
+        return None
+
+    def process_request(self, request, spider=None):
+        if not request.meta.get('catalog'):
+            return None
+
+        entry = self._fresh_entry(request.meta.get('original_url', request.url))
+        if entry:
+            if entry.get('etag'):
+                request.headers.setdefault('If-None-Match', entry['etag'])
+            if entry.get('last_modified'):
+                request.headers.setdefault('If-Modified-Since', entry['last_modified'])
+        return None
+
+    def process_response(self, request, response, spider=None):
+        if not request.meta.get('catalog'):
+            return response
+
+        url = request.meta.get('original_url', request.url)
+        if response.status == 304:
+            self.stats.inc_value('catalog_cache/not_modified')
+            logger.info(f"Catalog not modified, skipping: {url}")
+            raise CatalogUnchanged(f"Catalog not modified: {url}")
+
+        if response.status != 200:
+            return response
+
+        body_hash = hashlib.sha256(response.body).hexdigest()
+        entry = self._fresh_entry(url)
+        if entry and entry.get('body_hash') == body_hash:
+            self.stats.inc_value('catalog_cache/unchanged')
+            logger.info(f"Catalog body unchanged, skipping: {url}")
+            raise CatalogUnchanged(f"Catalog unchanged: {url}")
+
+        fields = {'body_hash': body_hash, 'parsed_at': time.time()}
+        # Header validators only mean something for direct fetches
+        if not request.meta.get('original_url'):
+            fields['etag'] = response.headers.get('ETag', b'').decode('latin-1') or None
+            fields['last_modified'] = response.headers.get('Last-Modified', b'').decode('latin-1') or None
+        request.meta['catalog_validator'] = fields
+        self.stats.inc_value('catalog_cache/changed')
+        return response
+
+    def spider_opened(self, spider=None):
+        # A daemon runs for days; a crash should not lose everything since it started
+        if self.save_interval > 0:
+            from twisted.internet import task
+            self.save_loop = task.LoopingCall(self.store.save)
+            self.save_loop.start(self.save_interval, now=False)
+
+    def catalog_parsed(self, url, fields):
+        self.store.update(url, **fields)
+
+    def spider_closed(self, spider=None):
+        if self.save_loop is not None and self.save_loop.running:
+            self.save_loop.stop()
+        self.store.save()
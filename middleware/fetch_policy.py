@@ -0,0 +1,105 @@
+import logging
+from urllib.parse import urlparse
+from scrapy import signals
+from scrapy.http import TextResponse
+
+logger = logging.getLogger(__name__)
+
+DIRECT = 'direct'
+PROXY = 'proxy'
+AUTO = 'auto'
+FETCH_POLICIES = {DIRECT, PROXY, AUTO}
+
+BLOCK_STATUSES = {403, 429}
+# Lower-cased fragments of common captcha and bot-challenge pages
+BLOCK_MARKERS = (
+    b'g-recaptcha', b'h-captcha', b'hcaptcha.com', b'cf-challenge', b'/cdn-cgi/challenge-platform',
+    b'captcha-delivery.com', b'are you a robot', b'px-captcha',
+)
+MARKER_SCAN_BYTES = 64 * 1024
+
+class FetchPolicyMiddleware:
+    """Decide per source whether a request goes direct or through ScrapingBee
+
+    Sources set `fetch` to direct, proxy or auto (SCRAPINGBEE_FETCH_POLICY when
+    unset). Requests that should be proxied are marked with meta 'use_proxy'
+    for ScrapingBeeMiddleware. In auto mode a request goes direct first; a
+    403/429, a captcha page or a catalog page without a single `news` match
+    retries it through the proxy, and its domain is proxied for the rest of
+    the run. Without --use-scrapingbee everything goes direct.
+
+    Sits below HttpCompressionMiddleware so it inspects decompressed bodies,
+    and above CatalogCacheMiddleware so blocked pages are never cached.
+    """
+
+    def __init__(self, crawler, enabled=False, default_policy=AUTO):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.enabled = enabled
+        self.default_policy = default_policy
+        self.policies = {}
+        self.proxied_domains = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(
+            crawler,
+            enabled=crawler.settings.getbool('SCRAPINGBEE_ENABLED', False),
+            default_policy=crawler.settings.get('SCRAPINGBEE_FETCH_POLICY', AUTO)
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        return middleware
+
+    def spider_opened(self, spider=None):
+        for source_name, config in getattr(self.crawler.spider, 'config', {}).items():
+            policy = config.get('fetch', self.default_policy)
+            if policy == PROXY and not self.enabled:
+                logger.warning(f"{source_name} is set to fetch through the proxy, but ScrapingBee is disabled")
+            self.policies[source_name] = policy
+
+    def policy_for(self, request):
+        return self.policies.get(request.meta.get('source_name'), self.default_policy)
+
+    def process_request(self, request, spider=None):
+        if not self.enabled or request.meta.get('use_proxy'):
+            return None
+
+        policy = self.policy_for(request)
+        if policy == PROXY or (policy == AUTO and urlparse(request.url).hostname in self.proxied_domains):
+            request.meta['use_proxy'] = True
+            self.stats.inc_value('fetch_policy/proxy')
+        else:
+            self.stats.inc_value('fetch_policy/direct')
+        return None
+
+    def process_response(self, request, response, spider=None):
+        if not self.enabled or request.meta.get('use_proxy') or self.policy_for(request) != AUTO:
+            return response
+
+        reason = self.block_reason(request, response)
+        if not reason:
+            return response
+
+        domain = urlparse(request.url).hostname
+        if domain not in self.proxied_domains:
+            logger.warning(f"Blocked on {domain} ({reason}), switching it to ScrapingBee for this run")
+            self.proxied_domains.add(domain)
+        self.stats.inc_value(f'fetch_policy/blocked/{reason}')
+        return request.replace(dont_filter=True, meta={**request.meta, 'use_proxy': True})
+
+    def block_reason(self, request, response):
+        """Name of the block signal in a direct response, or None"""
+        if response.status in BLOCK_STATUSES:
+            return f'status_{response.status}'
+        if response.status != 200 or not isinstance(response, TextResponse):
+            return None
+
+        head = response.body[:MARKER_SCAN_BYTES].lower()
+        if any(marker in head for marker in BLOCK_MARKERS):
+            return 'captcha'
+
+        if request.meta.get('catalog'):
+            plan = getattr(self.crawler.spider, 'plans', {}).get(request.meta.get('source_name'))
+            if plan is not None and plan.news is not None and not plan.news(response.selector.root):
+                return 'empty_catalog'
+        return None
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from utils.file_lock import FileLock, lock_path
+
+logger = logging.getLogger(__name__)
+
+# ScrapingBee statuses that say something about the key rather than the target
+EXHAUSTED_STATUSES = {401}
+BANNED_STATUSES = {403, 405}
+THROTTLED_STATUSES = {429}
+KEY_STATUSES = EXHAUSTED_STATUSES | BANNED_STATUSES | THROTTLED_STATUSES
+
+BILLING_PERIOD = 30 * 24 * 3600
+
+def key_id(api_key):
+    """Stable identifier for a key, so raw keys never land in the state file"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+class KeyState:
+    """Usage and cooldown of one API key within its billing period"""
+
+    def __init__(self, credit_limit, used=0, failures=0, parked_until=0.0, period_start=None, last_used=0.0):
+        self.credit_limit = credit_limit
+        self.used = used
+        self.failures = failures
+        self.parked_until = parked_until
+        self.period_start = period_start or time.time()
+        self.last_used = last_used
+
+    @property
+    def remaining(self):
+        return max(0, self.credit_limit - self.used)
+
+    def to_dict(self):
+        return {
+            'credit_limit': self.credit_limit,
+            'used': self.used,
+            'failures': self.failures,
+            'parked_until': self.parked_until,
+            'period_start': self.period_start,
+            'last_used': self.last_used,
+        }
+
+class ScrapingBeeKeyPool:
+    """Persistent pool of ScrapingBee keys that always hands out the one with most credits left
+
+    Usage is counted from the Spb-cost header of each response. Keys that
+    report no credits are parked until their billing period rolls over;
+    banned or throttled keys are parked with exponential backoff. State is
+    kept in a JSON file keyed by a hash of each key, so counts and cooldowns
+    survive restarts.
+    """
+
+    def __init__(self, api_keys, state_path, credit_limit=1000, base_backoff=60, max_backoff=6 * 3600):
+        self.api_keys = list(api_keys)
+        self.state_path = Path(state_path)
+        self.credit_limit = credit_limit
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.states = {}
+        # Credits spent since the last save, merged into whatever other shards wrote
+        self.used_since_save = {}
+        self.load()
+
+    def _read(self):
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Couldn't load ScrapingBee key state {self.state_path}, starting fresh: {e}")
+            return {}
+
+    def _state_from(self, saved, api_key):
+        fields = dict(saved.get(key_id(api_key), {}))
+        fields['credit_limit'] = self.credit_limit
+        return KeyState(**fields)
+
+    def load(self):
+        saved = self._read()
+        for api_key in self.api_keys:
+            self.states[api_key] = self._state_from(saved, api_key)
+        self._roll_periods(time.time())
+
+    def _roll_periods(self, now):
+        """Start a fresh budget for keys whose billing period has ended"""
+        for api_key, state in self.states.items():
+            if now - state.period_start >= BILLING_PERIOD:
+                self.states[api_key] = KeyState(self.credit_limit, period_start=now)
+
+    def save(self):
+        """Merge our usage into the state file on disk, under a lock shared with other shards"""
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with FileLock(lock_path(self.state_path)):
+                saved = self._read()
+                for api_key, state in self.states.items():
+                    if key_id(api_key) in saved:
+                        on_disk = self._state_from(saved, api_key)
+                        if on_disk.period_start >= state.period_start:
+                            on_disk.used += self.used_since_save.get(api_key, 0)
+                            if state.last_used >= on_disk.last_used:
+                                on_disk.failures = state.failures
+                            on_disk.parked_until = max(on_disk.parked_until, state.parked_until)
+                            on_disk.last_used = max(on_disk.last_used, state.last_used)
+                            self.states[api_key] = on_disk
+                    saved[key_id(api_key)] = self.states[api_key].to_dict()
+
+                temp_path = self.state_path.with_suffix('.tmp')
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(saved, f, indent=4)
+                temp_path.replace(self.state_path)
+            self.used_since_save.clear()
+        except Exception as e:
+            logger.error(f"Error saving ScrapingBee key state {self.state_path}: {e}")
+
+    def acquire(self):
+        """Get the usable key with the most remaining credits, or None if every key is parked"""
+        now = time.time()
+        self._roll_periods(now)
+        usable = [
+            (api_key, state) for api_key, state in self.states.items()
+            if state.parked_until <= now and state.remaining > 0
+        ]
+        if not usable:
+            return None
+        api_key, state = max(usable, key=lambda item: (item[1].remaining, -item[1].last_used))
+        state.last_used = now
+        return api_key
+
+    def record_success(self, api_key, cost=1):
+        state = self.states.get(api_key)
+        if state is None:
+            return
+        state.used += cost
+        state.failures = 0
+        self.used_since_save[api_key] = self.used_since_save.get(api_key, 0) + cost
+
+    def park(self, api_key, status, retry_after=None):
+        """Take a key out of rotation after a key-level error status"""
+        state = self.states.get(api_key)
+        if state is None:
+            return 0
+        now = time.time()
+        if status in EXHAUSTED_STATUSES:
+            self.used_since_save[api_key] = self.used_since_save.get(api_key, 0) + state.remaining
+            state.used = state.credit_limit
+            state.parked_until = state.period_start + BILLING_PERIOD
+        else:
+            state.failures += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+            if retry_after:
+                backoff = max(backoff, retry_after)
+            state.parked_until = now + backoff
+        self.save()
+        return state.parked_until - now
+
+    def health(self):
+        """Counts of available, parked and exhausted keys plus total remaining credits"""
+        now = time.time()
+        available = parked = exhausted = 0
+        for state in self.states.values():
+            if state.remaining <= 0:
+                exhausted += 1
+            elif state.parked_until > now:
+                parked += 1
+            else:
+                available += 1
+        return {
+            'keys_available': available,
+            'keys_parked': parked,
+            'keys_exhausted': exhausted,
+            'credits_remaining': sum(state.remaining for state in self.states.values()),
+        }
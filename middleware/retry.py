@@ -0,0 +1,235 @@
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from scrapy import signals
+from scrapy.downloadermiddlewares.retry import get_retry_request
+from scrapy.exceptions import DontCloseSpider, IgnoreRequest, NotConfigured
+from scrapy.utils.misc import load_object
+from config.logging_config import sampled
+
+logger = logging.getLogger(__name__)
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+
+# Statuses that count towards a domain's circuit breaker besides transient and throttled ones
+BLOCKED_STATUSES = {403}
+
+class RetryScheduled(IgnoreRequest):
+    """The request failed but a copy of it has been scheduled to retry"""
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - (now if now is not None else time.time()))
+
+class CircuitBreaker:
+    """Consecutive failures per domain; a domain is paused once they reach the threshold
+
+    After the cooldown requests go through again: the first failure reopens
+    the breaker for twice as long, a success closes it.
+    """
+
+    def __init__(self, threshold=5, cooldown=300, max_cooldown=3600):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = {}
+        self.trips = {}
+        self.open_until = {}
+
+    def allow(self, domain, now=None):
+        return (now if now is not None else time.monotonic()) >= self.open_until.get(domain, 0)
+
+    def record_success(self, domain):
+        self.failures.pop(domain, None)
+        self.trips.pop(domain, None)
+        self.open_until.pop(domain, None)
+
+    def record_failure(self, domain, now=None):
+        """Count a failure; the cooldown in seconds if this opened the breaker, else None"""
+        now = now if now is not None else time.monotonic()
+        # Requests already in flight when the breaker opened don't extend it
+        if now < self.open_until.get(domain, 0):
+            return None
+        self.failures[domain] = self.failures.get(domain, 0) + 1
+        if self.threshold <= 0 or self.failures[domain] < self.threshold:
+            return None
+        self.trips[domain] = self.trips.get(domain, 0) + 1
+        cooldown = min(self.max_cooldown, self.cooldown * 2 ** (self.trips[domain] - 1))
+        self.open_until[domain] = now + cooldown
+        # Half-open once the cooldown ends: one more failure is enough
+        self.failures[domain] = self.threshold - 1
+        return cooldown
+
+class BackoffRetryMiddleware:
+    """Retry by status class with jittered exponential backoff and a per-domain circuit breaker
+
+    Statuses in RETRY_THROTTLED_CODES are throttled and wait at least their
+    Retry-After; other RETRY_HTTP_CODES and RETRY_EXCEPTIONS are transient;
+    everything else is permanent and returned as is. A retry is re-queued
+    through the engine after its delay instead of holding a download slot.
+    Requests for a domain whose breaker is open are dropped until the
+    cooldown ends; their URLs stay untracked, so a later run picks them up.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('RETRY_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_retry_times = settings.getint('RETRY_TIMES')
+        self.retry_codes = {int(code) for code in settings.getlist('RETRY_HTTP_CODES')}
+        self.throttled_codes = {int(code) for code in settings.getlist('RETRY_THROTTLED_CODES', [429])}
+        self.exceptions = tuple(
+            load_object(exception) if isinstance(exception, str) else exception
+            for exception in settings.getlist('RETRY_EXCEPTIONS')
+        )
+        self.base_delay = settings.getfloat('RETRY_BACKOFF_BASE', 2.0)
+        self.max_delay = settings.getfloat('RETRY_BACKOFF_MAX', 120)
+        self.breaker = CircuitBreaker(
+            threshold=settings.getint('RETRY_BREAKER_THRESHOLD', 5),
+            cooldown=settings.getfloat('RETRY_BREAKER_COOLDOWN', 300),
+            max_cooldown=settings.getfloat('RETRY_BREAKER_MAX_COOLDOWN', 3600)
+        )
+        self.pending = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def classify(self, status):
+        if status in self.throttled_codes:
+            return THROTTLED
+        if status in self.retry_codes:
+            return TRANSIENT
+        return PERMANENT
+
+    @staticmethod
+    def domain(request):
+        return urlparse(request.meta.get('original_url', request.url)).hostname or ''
+
+    def backoff(self, retry_times):
+        """Exponential delay for the nth retry, half fixed and half random"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry_times - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def process_request(self, request, spider=None):
+        domain = self.domain(request)
+        if not self.breaker.allow(domain):
+            self.stats.inc_value('retry/breaker_dropped')
+            raise IgnoreRequest(f"Circuit breaker open for {domain}")
+        return None
+
+    def process_response(self, request, response, spider=None):
+        if request.meta.get('dont_retry'):
+            return response
+        # Every ScrapingBee key failed; that says nothing about the domain, so keep it out of the breaker
+        if request.meta.get('scrapingbee_key_failure'):
+            return response
+
+        status_class = self.classify(response.status)
+        domain = self.domain(request)
+        if status_class == PERMANENT:
+            if response.status in BLOCKED_STATUSES:
+                self.record_failure(domain)
+            elif response.status < 500:
+                self.breaker.record_success(domain)
+            return response
+
+        self.record_failure(domain)
+        if not self.breaker.allow(domain):
+            return response
+        delay = None
+        if status_class == THROTTLED:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None and retry_after > self.max_delay:
+                self.stats.inc_value('retry/retry_after_too_long')
+                logger.warning(f"Not retrying {request.url}: Retry-After {retry_after:.0f}s exceeds {self.max_delay:.0f}s")
+                return response
+            delay = retry_after
+
+        retry_request = self._retry_request(request, f'{status_class}_{response.status}')
+        if retry_request is None:
+            return response
+        self.schedule(retry_request, delay)
+        raise RetryScheduled(f"Retrying {request.url} after {response.status}")
+
+    def process_exception(self, request, exception, spider=None):
+        if not isinstance(exception, self.exceptions) or request.meta.get('dont_retry'):
+            return None
+
+        domain = self.domain(request)
+        self.record_failure(domain)
+        if not self.breaker.allow(domain):
+            return None
+        retry_request = self._retry_request(request, exception)
+        if retry_request is None:
+            return None
+        self.schedule(retry_request)
+        raise RetryScheduled(f"Retrying {request.url} after {type(exception).__name__}")
+
+    def record_failure(self, domain):
+        cooldown = self.breaker.record_failure(domain)
+        if cooldown:
+            self.stats.inc_value('retry/breaker_trips')
+            logger.warning(f"Circuit breaker opened for {domain}, pausing it for {cooldown:.0f}s")
+
+    def _retry_request(self, request, reason):
+        """A copy of the request with its retry count raised, or None once the budget is spent"""
+        # Retries go back to the original URL; ScrapingBee wraps it again
+        if request.meta.get('original_url'):
+            meta = {k: v for k, v in request.meta.items() if k not in ('original_url', 'scrapingbee_key')}
+            request = request.replace(url=request.meta['original_url'], meta=meta)
+        return get_retry_request(
+            request,
+            spider=self.crawler.spider,
+            reason=reason,
+            max_retry_times=request.meta.get('max_retry_times', self.max_retry_times)
+        )
+
+    def schedule(self, request, delay=None):
+        """Re-queue a request through the engine once its backoff has passed"""
+        from twisted.internet import reactor
+
+        backoff = self.backoff(request.meta.get('retry_times', 1))
+        delay = max(delay, backoff) if delay is not None else backoff
+        logger.info(f"Retrying {request.url} in {delay:.1f}s", extra=sampled(request.meta.get('source_name'), 'retry'))
+        self.stats.inc_value('retry/backoff_seconds', round(delay, 3))
+        self.pending.add(reactor.callLater(delay, self._resend, request))
+
+    def _resend(self, request):
+        self.pending = {call for call in self.pending if call.active()}
+        try:
+            self.crawler.engine.crawl(request)
+        except Exception as e:
+            logger.warning(f"Couldn't re-queue {request.url}: {e}")
+
+    def spider_idle(self, spider=None):
+        # Scheduled retries are not in the scheduler yet; don't let the spider close under them
+        self.pending = {call for call in self.pending if call.active()}
+        if self.pending:
+            raise DontCloseSpider
+
+    def spider_closed(self, spider=None):
+        for call in self.pending:
+            if call.active():
+                call.cancel()
+        self.pending.clear()
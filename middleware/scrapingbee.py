@@ -1,70 +1,139 @@
+import logging
+import os
+from urllib.parse import quote
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from middleware.key_pool import ScrapingBeeKeyPool, KEY_STATUSES
+from config.logging_config import sampled
+
+logger = logging.getLogger(__name__)
+
 class ScrapingBeeMiddleware:
-    def __init__(self, api_keys, enabled=False):
-        self.api_keys = api_keys
+    def __init__(self, key_pool, stats, enabled=False, max_retry_times=3, save_interval=0):
+        self.key_pool = key_pool
+        self.stats = stats
         self.enabled = enabled
-        self.key_pool = cycle(self.api_keys)
-        self.current_key = next(self.key_pool)
-        self.request_count = 0
-        self.rotation_threshold = int(os.getenv('ROTATION_THRESHOLD', '150'))
+        self.max_retry_times = max_retry_times
+        self.save_interval = save_interval
+        self.save_loop = None
         logger.info(f"ScrapingBee Middleware initialized with enabled={enabled}")
 
     @classmethod
     def from_crawler(cls, crawler):
         api_keys = [key.strip() for key in os.getenv('SCRAPINGBEE_API_KEYS', '').split(',') if key.strip()]
-        enabled = crawler.settings.get('SCRAPINGBEE_ENABLED', False)
+        enabled = crawler.settings.getbool('SCRAPINGBEE_ENABLED', False)
 
         if enabled and not api_keys:
             raise ValueError("No ScrapingBee API keys found in .env file")
 
-        return cls(api_keys=api_keys, enabled=enabled)
+        key_pool = ScrapingBeeKeyPool(
+            api_keys,
+            crawler.settings.get('SCRAPINGBEE_KEY_STATE_FILE', 'Tracker/scrapingbee_keys.json'),
+            credit_limit=int(os.getenv('SCRAPINGBEE_KEY_CREDITS', crawler.settings.getint('SCRAPINGBEE_KEY_CREDITS', 1000))),
+            base_backoff=crawler.settings.getfloat('SCRAPINGBEE_KEY_BACKOFF', 60),
+            max_backoff=crawler.settings.getfloat('SCRAPINGBEE_KEY_MAX_BACKOFF', 6 * 3600)
+        )
+        save_interval = 0
+        if crawler.settings.getbool('DAEMON_MODE'):
+            save_interval = crawler.settings.getfloat('DAEMON_CHECKPOINT_INTERVAL', 300)
+        middleware = cls(key_pool=key_pool, stats=crawler.stats, enabled=enabled,
+                         max_retry_times=crawler.settings.getint('RETRY_TIMES', 3), save_interval=save_interval)
+        if enabled:
+            crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+            crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider=None):
+        self.update_stats()
+        # In a daemon, credits used since the last save would be lost on a crash
+        if self.save_interval > 0:
+            from twisted.internet import task
+            self.save_loop = task.LoopingCall(self.key_pool.save)
+            self.save_loop.start(self.save_interval, now=False)
+
+    def spider_closed(self, spider=None):
+        if self.save_loop is not None and self.save_loop.running:
+            self.save_loop.stop()
+        self.key_pool.save()
+        self.update_stats()
 
-    def rotate_key(self):
-        self.current_key = next(self.key_pool)
-        self.request_count = 0
-        logger.info("Rotated to next ScrapingBee API key")
+    def update_stats(self):
+        """Mirror the key pool's health into the crawl stats"""
+        for name, value in self.key_pool.health().items():
+            self.stats.set_value(f'scrapingbee/{name}', value)
 
-    def process_request(self, request, spider):
+    def process_request(self, request, spider=None):
         if not self.enabled:
             return None
 
-        if 'scrapingbee.com' in request.url:
+        # FetchPolicyMiddleware marks the requests that should be proxied
+        if not request.meta.get('use_proxy') or 'scrapingbee.com' in request.url:
             return None
 
         original_url = request.url
-
-        if self.request_count >= self.rotation_threshold:
-            self.rotate_key()
+        api_key = self.key_pool.acquire()
+        if api_key is None:
+            self.stats.inc_value('scrapingbee/no_key_available')
+            logger.error(f"No ScrapingBee key available, dropping request for: {original_url}")
+            raise IgnoreRequest(f"No ScrapingBee key available for {original_url}")
 
         try:
             bee_url = (
                 f"https://app.scrapingbee.com/api/v1/"
-                f"?api_key={self.current_key}"
+                f"?api_key={api_key}"
                 f"&url={quote(original_url)}"
                 f"&render_js=false"
                 f"&premium_proxy=false"
             )
 
-            self.request_count += 1
-            logger.info(f"Making ScrapingBee request for: {original_url}")
+            logger.info(f"Making ScrapingBee request for: {original_url}",
+                        extra=sampled(request.meta.get('source_name'), 'proxied_request'))
 
             return request.replace(
                 url=bee_url,
                 dont_filter=True,
-                meta={**request.meta, 'original_url': original_url}
+                meta={**request.meta, 'original_url': original_url, 'scrapingbee_key': api_key}
             )
 
         except Exception as e:
             logger.error(f"Error constructing ScrapingBee request: {e}")
             return request
 
-    def process_response(self, request, response, spider):
+    def process_response(self, request, response, spider=None):
         original_url = request.meta.get('original_url')
         if not original_url:
             return response
 
-        if response.status in [401, 403, 405]:
-            logger.warning(f"Received {response.status} from ScrapingBee for {original_url}, rotating key")
-            self.rotate_key()
-            return Request(original_url, dont_filter=True, meta={'original_url': original_url})
+        api_key = request.meta.get('scrapingbee_key')
+        if response.status in KEY_STATUSES:
+            retry_after = response.headers.get('Retry-After')
+            parked_for = self.key_pool.park(
+                api_key, response.status,
+                retry_after=int(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+            self.stats.inc_value(f'scrapingbee/key_parked/{response.status}')
+            self.update_stats()
+            logger.warning(f"Received {response.status} from ScrapingBee for {original_url}, "
+                           f"parking key for {parked_for:.0f}s")
+
+            # Try the next key, but not more times than there are keys, and within the retry budget
+            attempts = request.meta.get('scrapingbee_attempts', 0) + 1
+            retry_times = request.meta.get('retry_times', 0) + 1
+            if attempts < len(self.key_pool.states) and retry_times <= request.meta.get('max_retry_times', self.max_retry_times):
+                meta = {k: v for k, v in request.meta.items() if k not in ('original_url', 'scrapingbee_key')}
+                meta['scrapingbee_attempts'] = attempts
+                meta['retry_times'] = retry_times
+                self.stats.inc_value('retry/count')
+                self.stats.inc_value('retry/reason_count/scrapingbee_key_rotation')
+                return request.replace(url=original_url, dont_filter=True, meta=meta)
+            # The status describes our key, not the target site
+            request.meta['scrapingbee_key_failure'] = True
+            return response.replace(url=original_url)
 
+        try:
+            cost = int(response.headers.get('Spb-cost', b'1'))
+        except ValueError:
+            cost = 1
+        self.key_pool.record_success(api_key, cost)
+        self.stats.inc_value('scrapingbee/credits_used', cost)
         return response.replace(url=original_url)
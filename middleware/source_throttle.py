@@ -0,0 +1,108 @@
+import logging
+from scrapy import signals
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the site wants us to slow down
+BACKOFF_STATUSES = {403, 429, 500, 502, 503, 504}
+
+class AdaptiveState:
+    """Latency and error observations for one source's download slot"""
+
+    def __init__(self, adaptive, concurrency=None):
+        self.min_concurrency = int(adaptive.get('min_concurrency', 1))
+        self.max_concurrency = int(adaptive.get('max_concurrency', 8))
+        self.target_latency = float(adaptive.get('target_latency', 2.0))
+        self.max_error_rate = float(adaptive.get('max_error_rate', 0.1))
+        self.window = int(adaptive.get('window', 20))
+        start = concurrency or self.min_concurrency
+        self.concurrency = max(self.min_concurrency, min(self.max_concurrency, int(start)))
+        self.reset()
+
+    def reset(self):
+        self.latencies = []
+        self.errors = 0
+        self.samples = 0
+
+    def record(self, latency, error):
+        """Add one response or failure; True when the window is full"""
+        self.samples += 1
+        if error:
+            self.errors += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        return self.samples >= self.window
+
+    def next_concurrency(self):
+        """Additive increase while fast and healthy, multiplicative decrease otherwise"""
+        error_rate = self.errors / self.samples if self.samples else 0.0
+        mean_latency = sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+        if error_rate > self.max_error_rate or (mean_latency is not None and mean_latency > self.target_latency):
+            return max(self.min_concurrency, self.concurrency // 2)
+        if mean_latency is not None and mean_latency < self.target_latency * 0.5:
+            return min(self.max_concurrency, self.concurrency + 1)
+        return self.concurrency
+
+class SourceThrottleMiddleware:
+    """Tune the concurrency of each source's download slot from observed latency and errors
+
+    Only sources with an `adaptive` block are tuned. Every `window` responses
+    the slot's concurrency is halved if the error rate or mean latency is over
+    target, raised by one if latency is well under target, and always kept
+    within [min_concurrency, max_concurrency].
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.sources = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        return middleware
+
+    def spider_opened(self, spider=None):
+        spider = self.crawler.spider
+        for source_name, config in getattr(spider, 'config', {}).items():
+            if config.get('adaptive'):
+                self.sources[source_name] = AdaptiveState(config['adaptive'], config.get('concurrency'))
+                self._set_concurrency(source_name, self.sources[source_name].concurrency)
+        if self.sources:
+            logger.info(f"Adaptive throttling enabled for: {', '.join(self.sources)}")
+
+    def process_response(self, request, response, spider=None):
+        self._observe(request, request.meta.get('download_latency'), response.status in BACKOFF_STATUSES)
+        return response
+
+    def process_exception(self, request, exception, spider=None):
+        self._observe(request, None, True)
+        return None
+
+    def _observe(self, request, latency, error):
+        source_name = request.meta.get('download_slot')
+        state = self.sources.get(source_name)
+        if state is None or not state.record(latency, error):
+            return
+
+        concurrency = state.next_concurrency()
+        if concurrency != state.concurrency:
+            logger.info(f"Adjusting {source_name} concurrency {state.concurrency} -> {concurrency} "
+                        f"({state.errors}/{state.samples} errors)")
+            state.concurrency = concurrency
+            self._set_concurrency(source_name, concurrency)
+        state.reset()
+
+    def _set_concurrency(self, source_name, concurrency):
+        """Apply to the live slot and to the settings used if the slot is recreated"""
+        downloader = self.crawler.engine.downloader if self.crawler.engine else None
+        if downloader is not None:
+            slot = downloader.slots.get(source_name)
+            if slot is not None:
+                slot.concurrency = concurrency
+            per_slot_settings = getattr(downloader, 'per_slot_settings', None)
+            if per_slot_settings is not None:
+                per_slot_settings.setdefault(source_name, {})['concurrency'] = concurrency
+        self.stats.set_value(f'source_throttle/{source_name}/concurrency', concurrency)
@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+import time
+from twisted.internet import defer, threads
+from storage.json_handler import JSONHandler
+from storage.sqlite_store import SQLiteArticleStore
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class StoragePipeline:
+    """Write scraped articles and tracker updates in batches from a worker thread"""
+
+    def __init__(self, storage_format='json', batch_size=50, flush_interval=2.0,
+                 max_queue_size=1000, fsync_batch_size=50, fsync_interval=5.0, sqlite_path=None, manifest=True):
+        self.storage_format = storage_format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        self.sqlite_path = sqlite_path
+        self.manifest = manifest
+        self.queue = queue.Queue()
+        self.waiters = []
+        self.crawler = None
+        self.spider = None
+        self.json_handler = None
+        self.article_store = None
+        self.worker = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            storage_format=settings.get('STORAGE_FORMAT', 'json'),
+            batch_size=settings.getint('STORAGE_BATCH_SIZE', 50),
+            flush_interval=settings.getfloat('STORAGE_FLUSH_INTERVAL', 2.0),
+            max_queue_size=settings.getint('STORAGE_MAX_QUEUE_SIZE', 1000),
+            fsync_batch_size=settings.getint('STORAGE_FSYNC_BATCH_SIZE', 50),
+            fsync_interval=settings.getfloat('STORAGE_FSYNC_INTERVAL', 5.0),
+            sqlite_path=settings.get('STORAGE_SQLITE_PATH') if settings.getbool('STORAGE_SQLITE_ENABLED') else None,
+            manifest=settings.getbool('STORAGE_MANIFEST', True)
+        )
+        pipeline.crawler = crawler
+        return pipeline
+
+    def open_spider(self, spider=None):
+        self.spider = self.crawler.spider
+        self.json_handler = JSONHandler(
+            self.spider.dir_manager,
+            storage_format=self.storage_format,
+            fsync_batch_size=self.fsync_batch_size,
+            fsync_interval=self.fsync_interval,
+            manifest=self.manifest
+        )
+        if self.sqlite_path:
+            self.article_store = SQLiteArticleStore(self.sqlite_path)
+        self.worker = threading.Thread(target=self._run, name='storage-pipeline', daemon=True)
+        self.worker.start()
+        logger.info(f"Storage pipeline started (batch_size={self.batch_size}, "
+                    f"flush_interval={self.flush_interval}s)")
+
+    def process_item(self, item, spider=None):
+        self.queue.put(item)
+
+        # Backpressure: hold the item until the worker has drained the queue,
+        # which keeps the scraper slot busy and stops new responses piling up
+        if self.queue.qsize() >= self.max_queue_size:
+            logger.debug(f"Storage queue full ({self.queue.qsize()} items), applying backpressure")
+            waiter = defer.Deferred()
+            self.waiters.append((waiter, item))
+            return waiter
+
+        return item
+
+    def close_spider(self, spider=None):
+        self.queue.put(_STOP)
+        return threads.deferToThread(self._shutdown)
+
+    def _shutdown(self):
+        """Wait for the worker to drain the queue, then compact storage"""
+        self.worker.join()
+        self.json_handler.close()
+        if self.article_store:
+            self.article_store.close()
+        logger.info("Storage pipeline flushed and closed")
+
+    def _run(self):
+        """Worker loop: flush when the batch is full or the flush interval elapses"""
+        batch = []
+        deadline = None
+        while True:
+            timeout = self.flush_interval if not batch else max(0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+
+            if item is None and not batch:
+                # Idle: finish off yesterday's files without waiting for the next write
+                self._roll_over()
+
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+
+    def _roll_over(self):
+        try:
+            self.json_handler.roll_over()
+        except Exception as e:
+            logger.error(f"Error rolling over storage: {e}")
+
+    def _flush(self, batch):
+        """Write a batch of articles, then persist the trackers they belong to"""
+        written = {}
+        stored = []
+        finished = set()
+        metrics = self.spider.metrics
+        try:
+            for item in batch:
+                source = item['source']
+                try:
+                    with metrics.timer(source, 'storage_write'):
+                        self.json_handler.safely_write_json(dict(item), source)
+                    written.setdefault(source, []).append(item['article_url'])
+                    stored.append(dict(item))
+                    metrics.inc('articles_written', source)
+                except Exception as e:
+                    logger.error(f"Error storing article {item.get('article_url')}: {e}")
+                    # Forget the URL so it is retried on the next run
+                    self.spider.url_tracker.remove_url(source, item.get('article_url'))
+
+            # Trackers are only saved once the records they cover are on disk
+            self.json_handler.flush()
+            if self.article_store and stored:
+                try:
+                    self.article_store.write_batch(stored)
+                except Exception as e:
+                    # The JSON files remain the record; the archive can be re-imported from them
+                    logger.error(f"Error indexing {len(stored)} articles in {self.sqlite_path}: {e}")
+            for source, urls in written.items():
+                with metrics.timer(source, 'tracker_save'):
+                    self.spider.url_tracker.save_tracker(source, urls)
+            # Written and tracked: a resumed run has nothing left to do for these
+            if self.spider.frontier is not None and written:
+                self.spider.frontier.complete([self.spider.frontier_key(url) for urls in written.values() for url in urls])
+            finished = {url for urls in written.values() for url in urls}
+
+            if batch:
+                logger.info(f"Flushed {len(batch)} articles for {len(written)} sources")
+
+        except Exception as e:
+            logger.error(f"Error flushing storage batch: {e}")
+
+        finally:
+            from twisted.internet import reactor
+            # Catalog validators and feed watermarks wait for this; anything not confirmed counts as failed
+            failed = [item.get('article_url') for item in batch if item.get('article_url') not in finished]
+            if batch:
+                reactor.callFromThread(self.spider.articles_written, finished, failed)
+            reactor.callFromThread(self._release_waiters)
+
+    def _release_waiters(self):
+        """Let held items continue once the queue is below its limit"""
+        while self.waiters and self.queue.qsize() < self.max_queue_size:
+            waiter, item = self.waiters.pop(0)
+            waiter.callback(item)
@@ -1,11 +1,184 @@
 import argparse
-from scrapy.crawler import CrawlerProcess
-from config.settings import get_settings, get_development_settings, get_production_settings
+import json
+import multiprocessing
+import sqlite3
+import sys
+from pathlib import Path
+from config.settings import get_settings, get_development_settings, get_production_settings, apply_source_throttling
 from config.logging_config import setup_logging
-from spiders.dynamic_spider import DynamicSpider
 from config.selectors.selector_manager import SelectorManager
+from utils.shard_planner import balance_shards, load_runtimes, update_runtimes, runtimes_from_stats
 from dotenv import load_dotenv
 
+def build_settings(args, selector_manager, source_names):
+    """Scrapy settings for the chosen environment, throttled for the given sources"""
+    if args.env == 'dev':
+        settings = get_development_settings()
+    else:
+        settings = get_production_settings()
+
+    settings['SCRAPINGBEE_ENABLED'] = args.use_scrapingbee
+    settings['PAGINATION_BACKFILL'] = args.backfill
+    settings['DAEMON_MODE'] = args.daemon
+    settings['RESUME'] = args.resume
+    if args.metrics_interval:
+        settings['METRICS_FLUSH_INTERVAL'] = args.metrics_interval
+
+    # Per-source download slots from concurrency/delay/max_rps in the source configs
+    source_configs = {}
+    for source_name in source_names:
+        try:
+            source_configs[source_name] = selector_manager.get_source_config(source_name)
+        except Exception as e:
+            print(f"Skipping throttle settings for {source_name}: {e}")
+    apply_source_throttling(settings, source_configs)
+    return settings
+
+def crawl(args, selector_manager, source_name=None, source_names=None, settings_overrides=None):
+    """Run one crawler over a single source, a list of sources, or all of them; return its stats"""
+    # The crawl stack is imported here so metadata commands start without Scrapy and Twisted
+    from scrapy.crawler import CrawlerProcess
+    from spiders.dynamic_spider import DynamicSpider
+
+    names = [source_name] if source_name else (source_names or selector_manager.get_all_sources())
+    settings = build_settings(args, selector_manager, names)
+    settings.update(settings_overrides or {})
+    # setup_logging owns the root logger; Scrapy's own root handler would write every line twice
+    process = CrawlerProcess(settings, install_root_handler=False)
+    crawler = process.create_crawler(DynamicSpider)
+
+    # Start the spider with specific source, a shard's sources, or all sources
+    process.crawl(
+        crawler,
+        source_name=source_name,  # Will be None if not specified
+        source_names=source_names,
+        selector_manager=selector_manager,
+        use_scrapingbee=args.use_scrapingbee
+    )
+
+    process.start()
+    return crawler.stats.get_stats()
+
+def run_shard(shard_index, source_names, args):
+    """Entry point of a shard process: its own logs, its own crawler, stats written for the parent"""
+    load_dotenv()
+    log_dir = Path('logs') / f'shard-{shard_index}'
+    setup_logging(log_dir=str(log_dir), log_level='DEBUG' if args.env == 'dev' else 'INFO')
+
+    stats = crawl(args, SelectorManager(), source_names=source_names, settings_overrides={
+        # One textfile per shard so a textfile collector picks them all up
+        'METRICS_TEXTFILE': f'logs/metrics/news_scraper_shard-{shard_index}.prom',
+        'METRICS_SUMMARY_FILE': str(log_dir / 'metrics.json'),
+    })
+    with open(log_dir / 'stats.json', 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=4, default=str)
+
+    if stats.get('finish_reason') != 'finished':
+        sys.exit(1)
+
+def run_sharded(args, selector_manager):
+    """Split all sources over worker processes balanced by past runtimes; return an exit code"""
+    shards = balance_shards(selector_manager.get_all_sources(), load_runtimes(), args.workers)
+    context = multiprocessing.get_context('spawn')
+    Path('logs').mkdir(exist_ok=True)
+
+    processes = []
+    for index, source_names in enumerate(shards):
+        stats_file = Path('logs') / f'shard-{index}' / 'stats.json'
+        stats_file.unlink(missing_ok=True)
+        print(f"Shard {index}: {', '.join(source_names)}")
+        process = context.Process(target=run_shard, args=(index, source_names, args), name=f'shard-{index}')
+        process.start()
+        processes.append((index, process, stats_file))
+
+    exit_code = 0
+    totals = {}
+    runtimes = {}
+    for index, process, stats_file in processes:
+        process.join()
+        if process.exitcode:
+            print(f"Shard {index} exited with status {process.exitcode}")
+            exit_code = 1
+        if not stats_file.exists():
+            exit_code = 1
+            continue
+
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        runtimes.update(runtimes_from_stats(stats))
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not key.startswith('source_runtime/'):
+                totals[key] = totals.get(key, 0) + value
+
+    update_runtimes(runtimes)
+    with open(Path('logs') / 'shard_stats.json', 'w', encoding='utf-8') as f:
+        json.dump({'shards': shards, 'exit_code': exit_code, 'stats': totals}, f, indent=4, sort_keys=True)
+
+    print(f"Scraped {totals.get('item_scraped_count', 0)} items across {len(shards)} shards, "
+          f"{totals.get('log_count/ERROR', 0)} errors")
+    return exit_code
+
+def run_query(args):
+    """Search the SQLite article archive and print the matches"""
+    from storage.sqlite_store import SQLiteArticleStore
+
+    db_path = args.db or get_settings()['STORAGE_SQLITE_PATH']
+    if not args.import_data and not Path(db_path).exists():
+        print(f"No article archive at {db_path}; crawl with STORAGE_SQLITE_ENABLED or use --import-data")
+        return 1
+
+    store = SQLiteArticleStore(db_path)
+    try:
+        if args.import_data:
+            count = store.import_directory(args.import_data)
+            print(f"Imported {count} articles from {args.import_data} into {db_path}")
+            if not (args.text or args.source or args.category or args.since or args.until or args.scraped_on):
+                return 0
+
+        try:
+            rows = store.query(text=args.text, source=args.source, category=args.category, since=args.since,
+                               until=args.until, scraped_on=args.scraped_on, limit=args.limit)
+        except sqlite3.OperationalError as e:
+            # Malformed FTS5 syntax such as an unbalanced quote
+            print(f"Invalid query: {e}")
+            return 1
+    finally:
+        store.close()
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row, ensure_ascii=False))
+        else:
+            print(f"{row['published_date'] or '-':<16}  {row['source']:<20}  {row['title']}")
+            print(f"{'':<16}  {row['article_url']}")
+            if row['snippet'] and args.text:
+                print(f"{'':<16}  {' '.join(row['snippet'].split())}")
+    if not args.json:
+        print(f"{len(rows)} articles")
+    return 0
+
+def run_changes(args):
+    """Print the records written after a cursor as JSON Lines, and the cursor to continue from"""
+    from storage.manifest import ChangeFeed
+
+    cursor = args.since
+    cursor_file = Path(args.cursor_file) if args.cursor_file else None
+    if cursor is None and cursor_file and cursor_file.exists():
+        cursor = cursor_file.read_text(encoding='utf-8').strip() or None
+
+    try:
+        changes, next_cursor = ChangeFeed(args.data_dir).read(cursor, limit=args.limit)
+    except ValueError as e:
+        print(f"Invalid cursor {cursor!r}: {e}", file=sys.stderr)
+        return 1
+
+    for change_cursor, record in changes:
+        print(json.dumps({'cursor': change_cursor, 'record': record}, ensure_ascii=False))
+    if cursor_file and next_cursor:
+        cursor_file.write_text(next_cursor + '\n', encoding='utf-8')
+    print(f"{len(changes)} changes, next cursor: {next_cursor or '-'}", file=sys.stderr)
+    return 0
+
 def main():
     parser = argparse.ArgumentParser(description='Run the news scraper')
     parser.add_argument('--use-scrapingbee', action='store_true',
@@ -15,8 +188,43 @@ def main():
     parser.add_argument('--source', help='Specific source to scrape (e.g., pr_news)')
     parser.add_argument('--list-sources', action='store_true',
                        help='List all available sources')
+    parser.add_argument('--backfill', action='store_true',
+                       help='Keep paginating past pages of already-scraped URLs, up to max_pages')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Split all sources across this many processes')
+    parser.add_argument('--daemon', action='store_true',
+                       help='Keep running and re-poll each source on its schedule')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run from its pending requests instead of the catalogs')
+    parser.add_argument('--metrics-interval', type=float, default=0,
+                       help='Also write crawl metrics every N seconds, not just at close')
+
+    subparsers = parser.add_subparsers(dest='command')
+    query_parser = subparsers.add_parser('query', help='Search the SQLite article archive')
+    query_parser.add_argument('text', nargs='?', help='Full-text search over title, abstract and body (FTS5 syntax)')
+    query_parser.add_argument('--source', help='Only articles from this source (e.g., PR_News)')
+    query_parser.add_argument('--category', help='Only articles in this category')
+    query_parser.add_argument('--since', help='Published on or after YYYY-MM-DD[ HH:MM]')
+    query_parser.add_argument('--until', help='Published on or before YYYY-MM-DD[ HH:MM]')
+    query_parser.add_argument('--scraped-on', help='Scraped on YYYY-MM-DD')
+    query_parser.add_argument('--limit', type=int, default=20, help='Maximum number of results')
+    query_parser.add_argument('--json', action='store_true', help='Print one JSON object per result')
+    query_parser.add_argument('--db', help='Archive database (default: STORAGE_SQLITE_PATH)')
+    query_parser.add_argument('--import-data', metavar='DIR',
+                              help='First load the JSON/JSONL files under a Data directory')
+    changes_parser = subparsers.add_parser('changes', help='Print articles written after a cursor')
+    changes_parser.add_argument('--since', metavar='CURSOR',
+                                help="DD-MM-YYYY:SEQ of the last change consumed (default: from the start)")
+    changes_parser.add_argument('--cursor-file', help='Read the cursor from this file and store the next one in it')
+    changes_parser.add_argument('--limit', type=int, default=1000, help='Maximum number of changes')
+    changes_parser.add_argument('--data-dir', default='Data', help='Data directory holding the date directories')
     args = parser.parse_args()
 
+    if args.command == 'query':
+        sys.exit(run_query(args))
+    if args.command == 'changes':
+        sys.exit(run_changes(args))
+
     # Load environment variables
     load_dotenv()
 
@@ -40,28 +248,18 @@ def main():
             print(f"Error: Config file not found at {config_file}")
             return
 
+    # Each shard sets up its own logging and settings
+    if args.workers > 1 and not args.source:
+        sys.exit(run_sharded(args, selector_manager))
+
     # Setup logging and settings
     if args.env == 'dev':
         loggers = setup_logging(log_level='DEBUG')
-        settings = get_development_settings()
     else:
         loggers = setup_logging(log_level='INFO')
-        settings = get_production_settings()
-
-    settings['SCRAPINGBEE_ENABLED'] = args.use_scrapingbee
-
-    # Initialize crawler process
-    process = CrawlerProcess(settings)
 
-    # Start the spider with specific source or all sources
-    process.crawl(
-        DynamicSpider,
-        source_name=args.source,  # Will be None if not specified
-        selector_manager=selector_manager,
-        use_scrapingbee=args.use_scrapingbee
-    )
-
-    process.start()
+    stats = crawl(args, selector_manager, source_name=args.source)
+    update_runtimes(runtimes_from_stats(stats))
 
 if __name__ == '__main__':
     main()
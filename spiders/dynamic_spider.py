@@ -1,48 +1,96 @@
 import scrapy
-import json
 import logging
-from datetime import datetime
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.spidermiddlewares.httperror import HttpError
+import time
+from datetime import datetime, timezone
+from itertools import count, zip_longest
 from pathlib import Path
 from utils.url_utils import URLUtils
-from utils.date_utils import parse_date
+from utils.date_utils import parse_date, OUTPUT_FORMAT
+from utils.url_router import URLRouter
 from storage.directory_manager import DirectoryManager
-from storage.json_handler import JSONHandler
-from extractors.field_extractor import FieldExtractor
+from trackers.url_tracker import URLTracker
+from trackers.sqlite_tracker import SQLiteTracker
+from trackers.fingerprint_index import FingerprintTracker
+from trackers.simhash_index import SimHashIndex, simhash
+from trackers.feed_watermarks import FeedWatermarkStore
+from trackers.crawl_frontier import CrawlFrontier
+from extractors.feed_parser import FEED_TYPES, FEED, iter_feed_entries
+from extensions.crawl_metrics import CrawlMetrics
+from middleware.catalog_cache import CatalogUnchanged, catalog_parsed
+from middleware.retry import RetryScheduled
+from config.logging_config import sampled
 
 logger = logging.getLogger(__name__)
 
+# Catalog pages are fetched before any article, articles newest first below them
+CATALOG_PRIORITY = 1000
+ARTICLE_PRIORITY_MAX = 999
+
+# Meta keys that describe a request, including those read when it finishes (finish_link,
+# the watermark callbacks); the rest is added by middlewares at download time, and
+# catalog_page only names a page open in this process
+FRONTIER_META = ('source_name', 'download_slot', 'catalog', 'page', 'catalog_url', 'lastmod', 'inflight_url',
+                 'feed_published')
+
+def article_priority(published_date, now=None):
+    """Request priority for an article: one step lower per hour of age, 0 when undated or very old"""
+    if not published_date:
+        return 0
+    try:
+        published = datetime.strptime(published_date, OUTPUT_FORMAT)
+    except ValueError:
+        return 0
+    age_hours = int(((now or datetime.now()) - published).total_seconds() // 3600)
+    return ARTICLE_PRIORITY_MAX - min(ARTICLE_PRIORITY_MAX, max(0, age_hours))
+
 class DynamicSpider(scrapy.Spider):
     name = 'dynamic_spider'
 
-    def __init__(self, selector_manager, source_name=None, use_scrapingbee=False, *args, **kwargs):
+    def __init__(self, selector_manager, source_name=None, use_scrapingbee=False, source_names=None, *args, **kwargs):
         super(DynamicSpider, self).__init__(*args, **kwargs)
 
         # Initialize components
         self.dir_manager = DirectoryManager()
-        self.json_handler = JSONHandler(self.dir_manager)
         self.selector_manager = selector_manager
 
+        # When each source last produced a response, reported as its runtime at close
+        self.started_at = time.monotonic()
+        self.source_activity = {}
+        # Per-source counters and stage timings, exported by CrawlMetricsExtension
+        self.metrics = CrawlMetrics()
+        # Catalog and feed pages whose article requests are still in flight
+        self.open_pages = {}
+        self.page_ids = count(1)
+        # Frontier URL of articles stored under another URL (redirects), until the pipeline writes them
+        self.frontier_urls = {}
+        # Article URLs requested and not finished yet; articles bypass the dupefilter, which
+        # would otherwise hold every URL for the life of a daemon and drop refetches of failed ones
+        self.inflight_urls = set()
+        # Meta of articles handed to StoragePipeline, until it reports their records written
+        self.unwritten_links = {}
+
         try:
-            # Load configs based on source_name
+            # Load configs and compiled extraction plans for one source, a shard's sources, or all
             if source_name:
-                source_config = self.selector_manager.load_source_config(source_name)
-                # Get the actual config from the first key (e.g., "PR News")
-                source_key = list(source_config.keys())[0]
-                self.config = {
-                    source_name: source_config[source_key]  # Get the nested config
-                }
-            else:
-                all_configs = self.selector_manager.load_all_configs()
-                self.config = {}
-                for source_name, source_config in all_configs.items():
-                    source_key = list(source_config.keys())[0]
-                    self.config[source_name] = source_config[source_key]
-
-            # Initialize URL trackers
-            self.url_trackers = {}
-            for source_name, source_config in self.config.items():
-                tracker_name = source_config['selectors']['source']
-                self.url_trackers[tracker_name] = self.load_url_tracker(tracker_name)
+                source_names = [source_name]
+            elif not source_names:
+                source_names = self.selector_manager.get_all_sources()
+            self.config = {}
+            self.plans = {}
+            for name in source_names:
+                try:
+                    self.plans[name] = self.selector_manager.get_extraction_plan(name)
+                    self.config[name] = self.selector_manager.get_source_config(name)
+                except Exception as e:
+                    if source_name:
+                        raise
+                    logger.error(f"Error loading config for {name}: {e}")
+
+            # Route responses to sources without scanning every config
+            self.router = URLRouter(self.config)
 
             # Set start URLs
             self.start_urls = []
@@ -55,151 +103,626 @@ class DynamicSpider(scrapy.Spider):
             logger.error(f"Error initializing spider: {e}")
             raise
 
-    def start_requests(self):
-        """Override start_requests to include headers"""
-        for url in self.start_urls:
-            config = self.get_config(url)
-            headers = config.get('headers', {})
-            yield scrapy.Request(url, headers=headers, dont_filter=True)
-
-    def load_url_tracker(self, source_name):
-        """Load URL tracker for a source"""
-        tracker_file = self.dir_manager.trackers_dir / f"{source_name}_tracker.json"
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(DynamicSpider, cls).from_crawler(crawler, *args, **kwargs)
+        timezone = crawler.settings.get('DATA_TIMEZONE')
+        if timezone and timezone != spider.dir_manager.timezone.zone:
+            spider.dir_manager = DirectoryManager(timezone=timezone)
+        spider.setup_url_tracker(crawler.settings)
+        spider.setup_dedup(crawler.settings)
+        spider.feed_watermarks = FeedWatermarkStore(
+            crawler.settings.get('FEED_WATERMARK_FILE', spider.dir_manager.trackers_dir / 'feed_watermarks.json')
+        )
+        spider.setup_frontier(crawler.settings)
+        spider.setup_daemon(crawler)
+        spider.retry_codes = {int(code) for code in crawler.settings.getlist('RETRY_HTTP_CODES')}
+        crawler.signals.connect(spider.request_dropped, signal=signals.request_dropped)
+        return spider
+
+    def setup_frontier(self, settings):
+        """Open the persistent request frontier; with RESUME, start from what it holds"""
+        self.resume = settings.getbool('RESUME', False)
+        self.frontier = None
+        if settings.getbool('FRONTIER_ENABLED', True):
+            self.frontier = CrawlFrontier(settings.get('FRONTIER_FILE', 'jobs/frontier.db'))
+
+    def request_payload(self, request):
+        """JSON-serializable description of a request we built"""
+        return {
+            'url': request.url,
+            'callback': request.callback.__name__ if request.callback else None,
+            'errback': request.errback.__name__ if request.errback else None,
+            'priority': request.priority,
+            'cb_kwargs': request.cb_kwargs,
+            'meta': {key: request.meta[key] for key in FRONTIER_META if key in request.meta},
+        }
+
+    def request_from_payload(self, payload):
+        meta = dict(payload['meta'])
+        meta['frontier_url'] = payload['url']
+        if meta.get('inflight_url'):
+            self.inflight_urls.add(meta['inflight_url'])
+        return scrapy.Request(
+            payload['url'],
+            callback=getattr(self, payload['callback']) if payload['callback'] else None,
+            errback=getattr(self, payload['errback']) if payload.get('errback') else None,
+            headers=self.config[meta['source_name']].get('headers', {}),
+            priority=payload['priority'],
+            dont_filter=True,
+            meta=meta,
+            cb_kwargs=payload['cb_kwargs']
+        )
+
+    def record_frontier(self, requests, completed=()):
+        """Persist newly discovered requests and drop finished URLs, before anything is scheduled"""
+        if self.frontier is None:
+            return
+        for request in requests:
+            request.meta['frontier_url'] = request.url
+        self.frontier.update(added=[self.request_payload(request) for request in requests],
+                             completed=[url for url in completed if url])
+
+    def frontier_key(self, article_url):
+        """The frontier URL an article was requested under; called once its record is written"""
+        return self.frontier_urls.pop(article_url, article_url)
+
+    def setup_dedup(self, settings):
+        """Open the cross-source SimHash index when DEDUP_ENABLED"""
+        self.dedup_action = settings.get('DEDUP_ACTION', 'tag')
+        self.simhash_index = None
+        if settings.getbool('DEDUP_ENABLED', True):
+            self.simhash_index = SimHashIndex(
+                settings.get('DEDUP_INDEX_FILE', self.dir_manager.trackers_dir / 'simhash_index.db'),
+                max_distance=settings.getint('DEDUP_MAX_DISTANCE', 3),
+                window_days=settings.getfloat('DEDUP_WINDOW_DAYS', 7)
+            )
+            self.simhash_index.evict()
+
+    def setup_url_tracker(self, settings):
+        """Open the tracker backend selected by TRACKER_BACKEND and load every source"""
+        trackers_dir = self.dir_manager.trackers_dir
+        if settings.get('TRACKER_BACKEND', 'sqlite') == 'fingerprint':
+            backend = FingerprintTracker(
+                trackers_dir / 'fingerprints',
+                use_bloom=settings.getbool('TRACKER_BLOOM_FILTER', False),
+                merge_threshold=settings.getint('TRACKER_MERGE_THRESHOLD', 4096),
+                merge_ratio=settings.getfloat('TRACKER_MERGE_RATIO', 0.1)
+            )
+        else:
+            backend = SQLiteTracker(trackers_dir / 'url_tracker.db')
+
+        self.url_tracker = URLTracker(trackers_dir, backend=backend)
+        for source_config in self.config.values():
+            self.url_tracker.load_tracker(
+                source_config['selectors']['source'],
+                retention_days=source_config.get('tracker_retention_days')
+            )
+
+    def setup_daemon(self, crawler):
+        """In DAEMON_MODE keep the spider open and re-poll each source on its schedule"""
+        self.daemon = crawler.settings.getbool('DAEMON_MODE', False)
+        self.default_interval = crawler.settings.getfloat('DAEMON_DEFAULT_INTERVAL', 3600)
+        self.checkpoint_interval = crawler.settings.getfloat('DAEMON_CHECKPOINT_INTERVAL', 300)
+        self.poll_loops = {}
+        self.checkpoint_loop = None
+        if self.daemon:
+            crawler.signals.connect(self.start_schedules, signal=signals.spider_opened)
+            crawler.signals.connect(self.stop_schedules, signal=signals.spider_closed)
+            crawler.signals.connect(self.spider_idle, signal=signals.spider_idle)
+
+    def schedule_interval(self, source_name):
+        """Seconds between polls of a source, from its `schedule` block"""
+        schedule = self.config[source_name].get('schedule') or {}
+        return float(schedule.get('interval', self.default_interval))
+
+    def start_schedules(self, spider=None):
+        from twisted.internet import task
+        for source_name in self.config:
+            loop = task.LoopingCall(self.poll_source, source_name)
+            loop.start(self.schedule_interval(source_name), now=False)
+            self.poll_loops[source_name] = loop
+        self.checkpoint_loop = task.LoopingCall(self.checkpoint)
+        self.checkpoint_loop.start(self.checkpoint_interval, now=False)
+        logger.info(f"Daemon mode: polling {len(self.poll_loops)} sources on their schedules")
+
+    def stop_schedules(self, spider=None):
+        for loop in [*self.poll_loops.values(), self.checkpoint_loop]:
+            if loop is not None and loop.running:
+                loop.stop()
+
+    def checkpoint(self):
+        """Periodic upkeep of a long-running daemon"""
         try:
-            if tracker_file.exists():
-                with open(tracker_file, 'r', encoding='utf-8') as f:
-                    return set(json.load(f))
-            return set()
+            if self.simhash_index:
+                self.simhash_index.evict()
+            self.feed_watermarks.save()
         except Exception as e:
-            logger.error(f"Error loading tracker for {source_name}: {e}")
-            return set()
+            # An exception would stop the LoopingCall
+            logger.error(f"Error in daemon checkpoint: {e}")
 
-    def save_url_tracker(self, source_name):
-        """Save URL tracker for a source"""
-        tracker_file = self.dir_manager.trackers_dir / f"{source_name}_tracker.json"
+    def poll_source(self, source_name):
+        """Queue a fresh pass over a source's catalog pages"""
         try:
-            with open(tracker_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.url_trackers[source_name]), f, indent=4)
-            logger.info(f"Updated tracker for {source_name}")
+            logger.info(f"Polling {source_name}")
+            for request in self.catalog_requests(source_name):
+                self.crawler.engine.crawl(request)
         except Exception as e:
-            logger.error(f"Error saving tracker for {source_name}: {e}")
+            # An exception would stop the LoopingCall, and with it the source's schedule
+            logger.error(f"Error polling {source_name}: {e}")
 
-    def get_config(self, url):
-        """Get configuration for a given URL"""
+    def spider_idle(self, spider=None):
+        # Between polls there is nothing queued; stay open for the next one
+        raise DontCloseSpider
+
+    async def start(self):
+        """Scrapy 2.13+ entry point; older versions call start_requests directly"""
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        """Catalog requests of all sources, interleaved so every source starts early"""
+        per_source = [self.source_start_requests(source_name) for source_name in self.config]
+        for requests in zip_longest(*per_source):
+            yield from (request for request in requests if request is not None)
+
+    def source_start_requests(self, source_name):
+        """A resumed source's pending requests, or a new job starting from its catalogs"""
+        if self.frontier is not None and self.resume and self.frontier.started(source_name):
+            pending = self.frontier.pending(source_name)
+            if pending:
+                logger.info(f"Resuming {source_name} with {len(pending)} pending requests")
+                return [self.request_from_payload(payload) for payload in pending]
+            logger.info(f"Nothing pending for {source_name}, starting from its catalogs")
+
+        if self.frontier is not None:
+            self.frontier.start([source_name])
+        return self.catalog_requests(source_name)
+
+    def catalog_requests(self, source_name):
+        """Requests for the configured catalog URLs of a source"""
+        config = self.config[source_name]
+        headers = config.get('headers', {})
+        requests = [
+            scrapy.Request(url, headers=headers, dont_filter=True, priority=CATALOG_PRIORITY, errback=self.link_failed,
+                           meta={'source_name': source_name, 'download_slot': source_name, 'catalog': True})
+            for url in config['url']
+        ]
+        self.record_frontier(requests)
+        return requests
+
+    def get_source_name(self, url):
+        """Get the source name for a given URL"""
         try:
-            original_url = URLUtils.extract_original_url(url)
-            for source_name, settings in self.config.items():
-                if any(base_url in original_url for base_url in settings['url']):
-                    return settings
+            return self.router.resolve(URLUtils.extract_original_url(url))
         except Exception as e:
-            logger.error(f"Error in get_config: {e}")
+            logger.error(f"Error in get_source_name: {e}")
         return None
 
+    def get_config(self, url):
+        """Get configuration for a given URL"""
+        source_name = self.get_source_name(url)
+        return self.config.get(source_name) if source_name else None
+
     def parse(self, response):
         original_url = response.meta.get('original_url', response.url)
-        site_config = self.get_config(original_url)
-
-        if site_config:
-            logger.info(f"Parsing: {original_url} using config for {site_config['selectors']['source']}")
-            return self.parse_catalog(response, site_config['selectors'], site_config['news_selector'])
+        # Requests we build carry their source; only foreign ones need routing
+        source_name = response.meta.get('source_name') or self.get_source_name(original_url)
+
+        if source_name in self.config:
+            self.source_activity[source_name] = time.monotonic()
+            logger.info(f"Parsing: {original_url} using config for {source_name}", extra=sampled(self.plans[source_name].source, 'catalog_page'))
+            if self.config[source_name].get('type') in FEED_TYPES:
+                return self.parse_feed(response, source_name)
+            return self.parse_catalog(response, source_name)
         else:
             logger.warning(f"No configuration found for URL: {original_url}")
 
-    def parse_catalog(self, response, selectors, news_selector):
+    def parse_catalog(self, response, source_name):
         try:
-            news = response.xpath(selectors['news'])
+            plan = self.plans[source_name]
+            headers = self.config[source_name].get('headers', {})
+
             original_url = response.meta.get('original_url', response.url)
             base_url = URLUtils.get_base_url(original_url)
-            source = selectors['source']
-            category = URLUtils.extract_category(original_url)
-
-            config = self.get_config(original_url)
-            headers = config.get('headers', {})
-
-            logger.info(f"Catalog scraped from {original_url}")
-
-            for article in news:
+            source = plan.source
+            # Later pages keep the category of the configured listing URL
+            catalog_url = response.meta.get('catalog_url', original_url)
+            category = URLUtils.extract_category(catalog_url)
+            page = response.meta.get('page', 1)
+            found_links = 0
+            new_links = 0
+            requests = []
+            unfinished = []
+
+            logger.info(f"Catalog scraped from {original_url} (page {page})")
+
+            with self.metrics.timer(source, 'extraction'):
+                entries = list(plan.extract_catalog(response))
+
+            for fields, link in entries:
                 # Extract fields
-                abstract = FieldExtractor.extract_field(article, selectors, 'abstract')
-                published_date = FieldExtractor.extract_field(article, selectors, 'published_date')
+                abstract = fields.get('abstract')
+                published_date = fields.get('published_date')
                 if published_date:
-                    published_date = parse_date(published_date)
+                    with self.metrics.timer(source, 'date_parsing'):
+                        published_date = parse_date(published_date, source)
 
                 # Get article URL
-                link = article.xpath(selectors['news_link']).get()
                 if not link:
                     continue
 
                 absolute_url = URLUtils.get_absolute_url(base_url, link, source)
+                found_links += 1
 
-                if absolute_url in self.url_trackers[source]:
-                    logger.info(f"Skipping already scraped URL: {absolute_url}")
+                if absolute_url in self.inflight_urls:
+                    # Requested by an earlier poll; the page is not committed until a later one sees it done
+                    logger.info(f"Skipping URL still being fetched: {absolute_url}", extra=sampled(source, 'skipped_url'))
+                    unfinished.append({})
+                    continue
+                if self.url_tracker.url_exists(source, absolute_url):
+                    logger.info(f"Skipping already scraped URL: {absolute_url}", extra=sampled(source, 'skipped_url'))
+                    self.metrics.inc('skipped_urls', source)
                     continue
 
-                logger.info(f"New URL found for {source}: {absolute_url}")
-                yield response.follow(
+                new_links += 1
+                self.metrics.inc('new_urls', source)
+                logger.info(f"New URL found for {source}: {absolute_url}", extra=sampled(source, 'new_url'))
+                self.inflight_urls.add(absolute_url)
+                requests.append(response.follow(
                     absolute_url,
                     self.parse_news,
+                    errback=self.link_failed,
                     headers=headers,
+                    dont_filter=True,
+                    priority=article_priority(published_date),
+                    meta={'source_name': source_name, 'download_slot': source_name, 'inflight_url': absolute_url},
                     cb_kwargs={
-                        'selectors': selectors,
-                        'news_selector': news_selector,
-                        'source': source,
+                        'source_name': source_name,
                         'abstract': abstract,
                         'published_date': published_date,
                         'category': category
                     }
-                )
+                ))
+
+            next_request = self.next_catalog_page(response, source_name, catalog_url, page, found_links, new_links)
+            if next_request:
+                requests.append(next_request)
+            self.open_page(response, requests, unfinished=unfinished)
+
+            # The page is done once everything it led to is in the frontier
+            self.record_frontier(requests, completed=[response.meta.get('frontier_url')])
+            yield from requests
 
         except Exception as e:
             logger.error(f"Error in parse_catalog: {str(e)}")
 
-    def parse_news(self, response, selectors, news_selector, source, abstract, published_date, category):
+    def next_catalog_page(self, response, source_name, catalog_url, page, found_links, new_links):
+        """Request the next catalog page unless this one held nothing new"""
+        if not found_links:
+            return None
+        # A page of already-tracked links means the rest are older still
+        if not new_links and not self.settings.getbool('PAGINATION_BACKFILL'):
+            logger.info(f"All {found_links} links on page {page} already seen, stopping pagination for {source_name}")
+            return None
+
+        page_url = response.meta.get('original_url', response.url)
+        next_url = self.plans[source_name].next_page_url(response, page, catalog_url, page_url)
+        if not next_url:
+            return None
+
+        logger.info(f"Following catalog page {page + 1} for {source_name}: {next_url}")
+        return scrapy.Request(
+            next_url,
+            headers=self.config[source_name].get('headers', {}),
+            errback=self.link_failed,
+            dont_filter=True,
+            priority=CATALOG_PRIORITY,
+            meta={'source_name': source_name, 'download_slot': source_name, 'catalog': True,
+                  'page': page + 1, 'catalog_url': catalog_url}
+        )
+
+    def parse_feed(self, response, source_name):
+        """Discover articles in an RSS/Atom feed, sitemap or sitemap index
+
+        Links and publish dates come straight from the XML, so neither the
+        catalog XPaths nor parse_date run. Entries older than the newest one
+        seen on an earlier run are skipped; feeds list newest first, so there
+        the first such entry ends the parse. Child sitemaps whose lastmod has
+        not moved are not fetched.
+
+        Watermarks only move once the feed's article requests have finished:
+        the newest date stops at the oldest failed article, and a child
+        sitemap with any failed article keeps its old lastmod, so failed
+        links are listed again on the next run.
+        """
         try:
+            config = self.config[source_name]
+            source = self.plans[source_name].source
+            headers = config.get('headers', {})
             original_url = response.meta.get('original_url', response.url)
+            category = config.get('category') or URLUtils.extract_category(response.meta.get('catalog_url', original_url))
+            backfill = self.settings.getbool('PAGINATION_BACKFILL')
+            watermark = None if backfill else self.feed_watermarks.get(original_url)
+            ordered = config['type'] == FEED
+
+            entries = []
+            stale = 0
+            with self.metrics.timer(source, 'extraction'):
+                for entry in iter_feed_entries(response.body):
+                    published = entry.published.isoformat() if entry.published else None
+                    if watermark and published and published < watermark and not entry.is_sitemap:
+                        stale += 1
+                        if ordered:
+                            break
+                        continue
+                    entries.append((entry, published))
+
+            logger.info(f"Feed scraped from {original_url}: {len(entries)} entries, {stale} older than the watermark")
+
+            newest = None
+            requests = []
+            unfinished = []
+            for entry, published in entries:
+                if entry.is_sitemap:
+                    if not backfill and published and published <= (self.feed_watermarks.get(entry.url, 'lastmod') or ''):
+                        logger.info(f"Sitemap not modified, skipping: {entry.url}")
+                        continue
+                    requests.append(scrapy.Request(
+                        entry.url,
+                        errback=self.link_failed,
+                        headers=headers,
+                        dont_filter=True,
+                        priority=CATALOG_PRIORITY,
+                        meta={'source_name': source_name, 'download_slot': source_name, 'catalog': True,
+                              'catalog_url': entry.url, 'lastmod': published}
+                    ))
+                    continue
+
+                if published and (newest is None or published > newest):
+                    newest = published
+                if entry.url in self.inflight_urls:
+                    logger.info(f"Skipping URL still being fetched: {entry.url}", extra=sampled(source, 'skipped_url'))
+                    unfinished.append({'feed_published': published})
+                    continue
+                if self.url_tracker.url_exists(source, entry.url):
+                    logger.info(f"Skipping already scraped URL: {entry.url}", extra=sampled(source, 'skipped_url'))
+                    self.metrics.inc('skipped_urls', source)
+                    continue
+
+                self.metrics.inc('new_urls', source)
+                logger.info(f"New URL found for {source}: {entry.url}", extra=sampled(source, 'new_url'))
+                published_date = entry.published.strftime(OUTPUT_FORMAT) if entry.published else None
+                self.inflight_urls.add(entry.url)
+                requests.append(response.follow(
+                    entry.url,
+                    self.parse_news,
+                    errback=self.link_failed,
+                    headers=headers,
+                    dont_filter=True,
+                    # Feed dates are UTC
+                    priority=article_priority(published_date, datetime.now(timezone.utc).replace(tzinfo=None)),
+                    meta={'source_name': source_name, 'download_slot': source_name, 'feed_published': published,
+                          'inflight_url': entry.url},
+                    cb_kwargs={
+                        'source_name': source_name,
+                        'abstract': entry.abstract,
+                        'published_date': published_date,
+                        'category': category
+                    }
+                ))
 
-            if original_url in self.url_trackers[source]:
-                logger.info(f"Already scraped URL (double-check): {original_url}")
+            lastmod = response.meta.get('lastmod')
+
+            def advance_watermarks(failed):
+                failed_dates = [meta['feed_published'] for meta in failed if meta.get('feed_published')]
+                # Entries older than the watermark are skipped, so it may not pass a failed one
+                self.feed_watermarks.advance(original_url, 'newest', min([newest, *failed_dates]) if newest else None)
+                # A child sitemap's lastmod only counts once everything in it is in
+                if not failed:
+                    self.feed_watermarks.advance(original_url, 'lastmod', lastmod)
+
+            self.open_page(response, requests, on_complete=advance_watermarks, unfinished=unfinished)
+            self.record_frontier(requests, completed=[response.meta.get('frontier_url')])
+            yield from requests
+
+        except Exception as e:
+            logger.error(f"Error in parse_feed: {str(e)}")
+
+    def open_page(self, response, requests, on_complete=None, unfinished=()):
+        """Track the requests a catalog or feed page led to; what the page taught us is committed once all have finished
+
+        An article finishes when StoragePipeline has written its record. The
+        page's catalog validator is only stored when nothing it led to
+        failed, so the page is not skipped on the next run while some of its
+        links are still unfetched or unwritten. Links skipped because an
+        earlier poll's request for them is still in flight (their meta in
+        unfinished) count as failed, since they may yet fail. A child page
+        (the next catalog page, a child sitemap) counts as finished once
+        everything it led to has. on_complete gets the meta of the requests
+        that failed.
+        """
+        page = {
+            'url': response.meta.get('original_url', response.url),
+            'meta': response.meta,
+            'validator': response.meta.get('catalog_validator'),
+            'pending': len(requests),
+            'failed': list(unfinished),
+            'on_complete': on_complete,
+        }
+        if not requests:
+            self.close_page(page)
+            return
+        page_id = next(self.page_ids)
+        self.open_pages[page_id] = page
+        for request in requests:
+            request.meta['catalog_page'] = page_id
+
+    def close_page(self, page):
+        if page['validator'] and not page['failed']:
+            self.crawler.signals.send_catch_log(catalog_parsed, url=page['url'], fields=page['validator'])
+        if page['on_complete']:
+            page['on_complete'](page['failed'])
+        self.finish_link(page['meta'], failed=bool(page['failed']))
+
+    def finish_link(self, meta, failed=False):
+        """Count a request of an open page as finished"""
+        self.inflight_urls.discard(meta.get('inflight_url'))
+        page_id = meta.get('catalog_page')
+        page = self.open_pages.get(page_id)
+        if page is None:
+            return
+        if failed:
+            page['failed'].append(meta)
+        page['pending'] -= 1
+        if page['pending'] <= 0:
+            del self.open_pages[page_id]
+            self.close_page(page)
+
+    def articles_written(self, urls, failed_urls=()):
+        """Called by StoragePipeline, in the reactor thread, once a batch has been flushed"""
+        for url in urls:
+            self.article_finished(url)
+        for url in failed_urls:
+            self.article_finished(url, failed=True)
+
+    def article_finished(self, url, failed=False):
+        meta = self.unwritten_links.pop(url, None)
+        if meta is not None:
+            self.finish_link(meta, failed=failed)
+
+    def link_failed(self, failure):
+        """Errback of the requests catalog and feed pages lead to"""
+        # A retry of the request is on its way back through the scheduler
+        if failure.check(RetryScheduled):
+            return
+        request = failure.request
+        # Nothing more will happen to the request in this job; a later run rediscovers it if it failed
+        self.record_frontier([], completed=[request.meta.get('frontier_url')])
+        # Nothing under an unchanged child page is new
+        if failure.check(CatalogUnchanged):
+            self.finish_link(request.meta)
+            return
+        # A permanent status like 404 won't change on the next run either
+        failed = not (failure.check(HttpError) and failure.value.response.status not in self.retry_codes)
+        logger.warning(f"Request failed: {request.url}: {failure.value}",
+                       extra=sampled(request.meta.get('source_name'), 'failed_request'))
+        self.finish_link(request.meta, failed=failed)
+
+    def request_dropped(self, request, spider=None):
+        # Our requests bypass the dupefilter, so nothing else will fetch this one in this job
+        self.finish_link(request.meta, failed=True)
+
+    def parse_news(self, response, source_name, abstract, published_date, category):
+        failed = False
+        pipelined = False
+        try:
+            self.source_activity[source_name] = time.monotonic()
+            plan = self.plans[source_name]
+            source = plan.source
+            original_url = response.meta.get('original_url', response.url)
+
+            if self.url_tracker.url_exists(source, original_url):
+                logger.info(f"Already scraped URL (double-check): {original_url}", extra=sampled(source, 'already_scraped'))
+                self.record_frontier([], completed=[response.meta.get('frontier_url')])
                 return
 
-            self.url_trackers[source].add(original_url)
+            self.url_tracker.add_url(source, original_url)
             base_url = URLUtils.get_base_url(original_url)
 
-            # Extract all fields
+            # Extract all fields in one pass of the compiled plan
+            with self.metrics.timer(source, 'extraction'):
+                article = plan.extract_article(response, base_url)
             news_details = {
                 'source': source,
                 'category': category,
                 'published_date': published_date,
                 'article_date': None,
-                'title': FieldExtractor.extract_field(response, news_selector, 'title'),
-                'author': FieldExtractor.extract_field(response, news_selector, 'author'),
+                'title': article.get('title'),
+                'author': article.get('author'),
                 'abstract': abstract,
-                'detailed_news': FieldExtractor.extract_field(response, news_selector, 'content'),
+                'detailed_news': article.get('content'),
                 'article_url': original_url,
-                'attachments': FieldExtractor.extract_field(response, news_selector, 'attachment', base_url),
-                'contacts': FieldExtractor.extract_field(response, news_selector, 'contact_details'),
+                'attachments': article.get('attachment'),
+                'contacts': article.get('contact_details'),
+                'duplicate_of': None,
                 'scraping_date': datetime.now().strftime("%Y-%m-%d"),
                 'scraping_time': datetime.now().strftime("%H:%M")
             }
 
             # Process article date if present
-            article_date = FieldExtractor.extract_field(response, news_selector, 'article_date')
+            article_date = article.get('article_date')
             if article_date:
-                news_details['article_date'] = parse_date(article_date)
+                with self.metrics.timer(source, 'date_parsing'):
+                    news_details['article_date'] = parse_date(article_date, source)
+
+            # The pipeline completes the frontier row by the article URL
+            frontier_url = response.meta.get('frontier_url')
+            if frontier_url and frontier_url != original_url:
+                self.frontier_urls[original_url] = frontier_url
 
-            # Save data
-            self.json_handler.safely_write_json(news_details, source)
-            self.save_url_tracker(source)
+            if self.simhash_index and not self.check_duplicate(news_details, source):
+                return
 
+            # Storage and tracker writes happen in StoragePipeline, which also finishes the link
+            self.unwritten_links[original_url] = response.meta
+            pipelined = True
             yield news_details
 
+        except GeneratorExit:
+            # Closed before the item went through, at shutdown
+            self.url_tracker.remove_url(source, original_url)
+            self.article_finished(original_url, failed=True)
+            raise
+
         except Exception as e:
+            failed = True
             logger.error(f"Error parsing news page {response.url}: {e}")
-            if original_url in self.url_trackers[source]:
-                self.url_trackers[source].remove(original_url)
+            self.url_tracker.remove_url(source, original_url)
+            self.record_frontier([], completed=[response.meta.get('frontier_url')])
+
+        finally:
+            if not pipelined:
+                self.finish_link(response.meta, failed=failed)
+
+    def check_duplicate(self, news_details, source):
+        """Tag or drop near-duplicates of recently indexed articles; False means drop"""
+        with self.metrics.timer(source, 'dedup'):
+            fingerprint = simhash(f"{news_details['title'] or ''} {news_details['detailed_news'] or ''}")
+            if fingerprint is None:
+                return True
+            url = news_details['article_url']
+            match = self.simhash_index.find(fingerprint)
+            # A refetch of an article whose write failed is not a duplicate of itself
+            if match is None or match[0] == url:
+                if match is None:
+                    self.simhash_index.add(fingerprint, url, source)
+                return True
+
+        duplicate_url, duplicate_source, distance = match
+        self.metrics.inc('near_duplicates', source)
+        if self.dedup_action == 'drop':
+            logger.info(f"Dropping near-duplicate {url} of {duplicate_url} ({duplicate_source}, distance {distance})")
+            # Nothing goes through the pipeline, so commit the URL here to skip it next run
+            self.url_tracker.save_tracker(source, [url])
+            self.record_frontier([], completed=[self.frontier_key(url)])
+            return False
+
+        logger.info(f"Tagging near-duplicate {url} of {duplicate_url} ({duplicate_source}, distance {distance})")
+        news_details['duplicate_of'] = duplicate_url
+        return True
 
     def closed(self, reason):
         """Handle spider closure"""
-        for source_name, tracker in self.url_trackers.items():
-            self.save_url_tracker(source_name)
-            logger.info(f"Final tracker save for {source_name}")
+        for source_name, last_activity in self.source_activity.items():
+            self.crawler.stats.set_value(f'source_runtime/{source_name}', round(last_activity - self.started_at, 3))
+        self.url_tracker.close()
+        self.feed_watermarks.save()
+        if self.frontier is not None:
+            # A crawl that ran to the end leaves nothing to resume
+            if reason == 'finished':
+                self.frontier.finish(self.config)
+            self.frontier.close()
+        if self.simhash_index:
+            self.simhash_index.close()
+        logger.info("Final tracker save completed")
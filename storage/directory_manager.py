@@ -1,10 +1,14 @@
 from pathlib import Path
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import pytz
 
 logger = logging.getLogger(__name__)
 
+# Name of each day's directory under base_dir
+DATE_DIR_FORMAT = "%d-%m-%Y"
+
 class DirectoryManager:
     def __init__(self, base_dir="Data", tracker_dir="Tracker", timezone='Asia/Kolkata'):
         self.base_dir = Path(base_dir)
@@ -16,16 +20,24 @@ class DirectoryManager:
         """Create necessary directories"""
         self.base_dir.mkdir(exist_ok=True)
         self.tracker_dir.mkdir(exist_ok=True)
+        self._roll_date_dir()
 
-        # Create today's date directory
-        today = datetime.now(self.timezone).strftime("%d-%m-%Y")
-        self.today_dir = self.base_dir / today
+    def _roll_date_dir(self):
+        """Create today's date directory and note when the next one starts"""
+        now = datetime.now(self.timezone)
+        self.today_dir = self.base_dir / now.strftime(DATE_DIR_FORMAT)
         self.today_dir.mkdir(exist_ok=True)
 
+        next_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        self.rollover_at = self.timezone.localize(next_day).timestamp()
+
         logger.info(f"Created/verified directory structure: {self.today_dir}")
 
     @property
     def data_dir(self):
+        # Long-running processes move to a new directory at midnight in self.timezone
+        if time.time() >= self.rollover_at:
+            self._roll_date_dir()
         return self.today_dir
 
     @property
@@ -1,42 +1,216 @@
 import json
 import logging
+import os
+import time
 from pathlib import Path
+from config.logging_config import sampled
+from storage.manifest import MANIFEST_NAME, append_entries
 
 logger = logging.getLogger(__name__)
 
+class _JSONLStream:
+    """Open append handle for one source's JSON Lines file"""
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, 'a', encoding='utf-8')
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+        # A crash can leave a torn last line; start on a fresh one
+        if self.handle.tell() > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.handle.write('\n')
+
+    def sync(self):
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.handle.close()
+
 class JSONHandler:
-    def __init__(self, directory_manager):
+    def __init__(self, directory_manager, storage_format='json', fsync_batch_size=50, fsync_interval=5.0,
+                 manifest=True):
         self.dir_manager = directory_manager
+        self.storage_format = storage_format
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        self.manifest = manifest
+        self._streams = {}
+        # (source, offset, length) per date directory, added to its manifest once the records are synced
+        self._manifest_pending = {}
 
     def safely_write_json(self, data, source):
         """Safely write JSON data to file with error handling and atomic writing"""
+        if self.storage_format == 'jsonl':
+            return self.append_jsonl(data, source)
+
         try:
             filename = f"{source}.json"
             file_path = self.dir_manager.data_dir / filename
 
             # Load existing data or create new array
-            existing_data = []
-            if file_path.exists():
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                        if not isinstance(existing_data, list):
-                            existing_data = [existing_data]
-                except json.JSONDecodeError:
-                    logger.warning(f"Couldn't decode existing file {file_path}, starting fresh")
+            existing_data = self._load_array(file_path)
 
             # Append new data
             existing_data.append(data)
 
-            # Write to temporary file first
-            temp_path = file_path.with_suffix('.tmp')
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=4)
-
-            # Atomic rename
-            temp_path.replace(file_path)
-            logger.info(f"Successfully wrote data to {file_path}")
+            self._write_array(file_path, existing_data)
+            logger.info(f"Successfully wrote data to {file_path}", extra=sampled(source, 'article_written'))
 
         except Exception as e:
             logger.error(f"Error writing JSON file {filename}: {e}")
             raise
+
+    def append_jsonl(self, data, source):
+        """Append one record to the source's JSON Lines file, fsyncing in batches"""
+        try:
+            stream = self._get_stream(source)
+            offset = stream.handle.tell()
+            stream.handle.write(json.dumps(data, ensure_ascii=False) + '\n')
+            stream.handle.flush()
+            stream.pending += 1
+            if self.manifest:
+                self._manifest_pending.setdefault(stream.path.parent, []).append(
+                    (source, offset, stream.handle.tell() - offset)
+                )
+
+            if (stream.pending >= self.fsync_batch_size or
+                    time.monotonic() - stream.last_sync >= self.fsync_interval):
+                stream.sync()
+
+            logger.debug(f"Appended record to {stream.path}")
+
+        except Exception as e:
+            logger.error(f"Error appending to JSON Lines file for {source}: {e}")
+            raise
+
+    def _get_stream(self, source):
+        """Get the append stream for a source, compacting the old file on day rollover"""
+        path = self.dir_manager.data_dir / f"{source}.jsonl"
+        stream = self._streams.get(source)
+
+        if stream and stream.path != path:
+            logger.info(f"Date directory changed for {source}, compacting {stream.path}")
+            stream.close()
+            self._write_manifest()
+            del self._streams[source]
+            self.compact_file(stream.path)
+            stream = None
+
+        if stream is None:
+            stream = _JSONLStream(path)
+            self._streams[source] = stream
+        return stream
+
+    def roll_over(self):
+        """Close and compact streams still open in a previous day's directory"""
+        data_dir = self.dir_manager.data_dir
+        for source, stream in list(self._streams.items()):
+            if stream.path.parent != data_dir:
+                logger.info(f"Date directory changed, compacting {stream.path}")
+                stream.close()
+                self._write_manifest()
+                del self._streams[source]
+                self.compact_file(stream.path)
+
+    def flush(self):
+        """Fsync every open JSON Lines file, then list the synced records in the manifests"""
+        for stream in self._streams.values():
+            if stream.pending:
+                stream.sync()
+        self._write_manifest()
+
+    def _write_manifest(self):
+        """Append pending entries to each date directory's manifest; their records must be synced already"""
+        pending, self._manifest_pending = self._manifest_pending, {}
+        for data_dir, entries in pending.items():
+            try:
+                append_entries(data_dir / MANIFEST_NAME, entries)
+            except Exception as e:
+                logger.error(f"Error appending {len(entries)} entries to {data_dir / MANIFEST_NAME}: {e}")
+
+    def compact(self, data_dir=None):
+        """Compact every JSON Lines file in a date directory into its array file"""
+        data_dir = Path(data_dir) if data_dir else self.dir_manager.data_dir
+        for jsonl_path in sorted(data_dir.glob('*.jsonl')):
+            stream = next((s for s in self._streams.values() if s.path == jsonl_path), None)
+            if stream and stream.pending:
+                stream.sync()
+            self.compact_file(jsonl_path)
+
+    def compact_file(self, jsonl_path):
+        """Rebuild <source>.json from <source>.jsonl, keeping records written in array mode"""
+        jsonl_path = Path(jsonl_path)
+        file_path = jsonl_path.with_suffix('.json')
+        try:
+            records = []
+            with open(jsonl_path, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupt line {line_no} in {jsonl_path}")
+
+            # The JSON Lines file holds the whole day, so earlier compactions
+            # are superseded; only records from array mode are carried over
+            jsonl_urls = {r.get('article_url') for r in records if isinstance(r, dict)}
+            existing_data = [
+                r for r in self._load_array(file_path)
+                if not (isinstance(r, dict) and r.get('article_url') in jsonl_urls)
+            ]
+
+            self._write_array(file_path, existing_data + records)
+            logger.info(f"Compacted {len(records)} records from {jsonl_path} into {file_path}")
+
+        except Exception as e:
+            logger.error(f"Error compacting {jsonl_path}: {e}")
+            raise
+
+    def close(self):
+        """Close all JSON Lines streams and compact them into array files"""
+        streams = list(self._streams.values())
+        self._streams = {}
+        for stream in streams:
+            try:
+                stream.close()
+            except Exception as e:
+                logger.error(f"Error closing stream {stream.path}: {e}")
+        self._write_manifest()
+        for stream in streams:
+            try:
+                self.compact_file(stream.path)
+            except Exception as e:
+                logger.error(f"Error compacting {stream.path}: {e}")
+
+    def _load_array(self, file_path):
+        """Load an existing array file, or an empty list"""
+        existing_data = []
+        if file_path.exists():
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    existing_data = json.load(f)
+                    if not isinstance(existing_data, list):
+                        existing_data = [existing_data]
+            except json.JSONDecodeError:
+                logger.warning(f"Couldn't decode existing file {file_path}, starting fresh")
+        return existing_data
+
+    def _write_array(self, file_path, data):
+        """Write an array file through a temporary file and atomic rename"""
+        temp_path = file_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Atomic rename
+        temp_path.replace(file_path)
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from storage.directory_manager import DATE_DIR_FORMAT
+from utils.file_lock import FileLock, lock_path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.idx'
+# Every entry is one fixed-width line, so entry n starts at byte (n - 1) * ENTRY_SIZE
+ENTRY_SIZE = 128
+
+def format_entry(seq, source, offset, length):
+    """One manifest line: sequence number, byte offset and length in <source>.jsonl, source"""
+    line = f"{seq:>12} {offset:>14} {length:>10} {source}"
+    encoded = line.encode('utf-8')
+    if len(encoded) > ENTRY_SIZE - 1:
+        raise ValueError(f"Source name too long for a manifest entry: {source!r}")
+    return encoded.ljust(ENTRY_SIZE - 1) + b'\n'
+
+def parse_entry(line):
+    """(seq, source, offset, length) from a manifest line"""
+    seq, offset, length, source = line.decode('utf-8').split(None, 3)
+    return int(seq), source.rstrip(), int(offset), int(length)
+
+def append_entries(manifest_path, entries):
+    """Append (source, offset, length) entries with the next sequence numbers; the last one is returned
+
+    Writers in other processes share the manifest, so sequence numbers are
+    assigned under its file lock. A torn entry left by a crash is cut off first.
+    """
+    manifest_path = Path(manifest_path)
+    with FileLock(lock_path(manifest_path)):
+        with open(manifest_path, 'ab') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size % ENTRY_SIZE:
+                size -= size % ENTRY_SIZE
+                f.truncate(size)
+            seq = size // ENTRY_SIZE
+            for source, offset, length in entries:
+                seq += 1
+                f.write(format_entry(seq, source, offset, length))
+            f.flush()
+            os.fsync(f.fileno())
+    return seq
+
+def parse_cursor(cursor):
+    """(date directory name, last consumed seq) from a 'DD-MM-YYYY:SEQ' cursor"""
+    day, _, seq = cursor.partition(':')
+    datetime.strptime(day, DATE_DIR_FORMAT)
+    return day, int(seq or 0)
+
+class ChangeFeed:
+    """Read the records written after a cursor, from the per-day manifests
+
+    A cursor is '<date directory>:<seq>' of the last record consumed. Only
+    the manifest entries after it are read, and each record is read from
+    its byte range in the source's JSON Lines file, so the cost depends on
+    the number of new records rather than the size of the day's data.
+    """
+
+    def __init__(self, data_dir='Data'):
+        self.data_dir = Path(data_dir)
+
+    def days(self):
+        """Date directories that have a manifest, oldest first"""
+        days = []
+        for path in self.data_dir.glob(f'*/{MANIFEST_NAME}'):
+            try:
+                days.append((datetime.strptime(path.parent.name, DATE_DIR_FORMAT), path.parent.name))
+            except ValueError:
+                continue
+        return [name for _, name in sorted(days)]
+
+    def read(self, cursor=None, limit=1000):
+        """Up to `limit` (cursor, record) pairs after a cursor, and the cursor to continue from"""
+        start_day, start_seq = parse_cursor(cursor) if cursor else (None, 0)
+        start_date = datetime.strptime(start_day, DATE_DIR_FORMAT) if start_day else None
+        changes = []
+        next_cursor = cursor
+
+        for day in self.days():
+            if start_date and datetime.strptime(day, DATE_DIR_FORMAT) < start_date:
+                continue
+            first_seq = start_seq if day == start_day else 0
+            for seq, record in self._read_day(day, first_seq, limit - len(changes)):
+                next_cursor = f"{day}:{seq}"
+                changes.append((next_cursor, record))
+            if len(changes) >= limit:
+                break
+        return changes, next_cursor
+
+    def _read_day(self, day, after_seq, limit):
+        day_dir = self.data_dir / day
+        files = {}
+        try:
+            with open(day_dir / MANIFEST_NAME, 'rb') as manifest:
+                manifest.seek(after_seq * ENTRY_SIZE)
+                while limit > 0:
+                    line = manifest.read(ENTRY_SIZE)
+                    # A partial entry is still being written
+                    if len(line) < ENTRY_SIZE:
+                        break
+                    seq, source, offset, length = parse_entry(line)
+                    if source not in files:
+                        files[source] = open(day_dir / f"{source}.jsonl", 'rb')
+                    data_file = files[source]
+                    data_file.seek(offset)
+                    yield seq, json.loads(data_file.read(length))
+                    limit -= 1
+        finally:
+            for data_file in files.values():
+                data_file.close()
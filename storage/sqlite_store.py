@@ -0,0 +1,170 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from utils.date_utils import OUTPUT_FORMAT
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    'article_url', 'source', 'category', 'published_date', 'published_at', 'article_date', 'title', 'author',
+    'abstract', 'detailed_news', 'attachments', 'contacts', 'duplicate_of', 'scraping_date', 'scraping_time',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    article_url TEXT NOT NULL UNIQUE,
+    source TEXT,
+    category TEXT,
+    published_date TEXT,
+    published_at TEXT,
+    article_date TEXT,
+    title TEXT,
+    author TEXT,
+    abstract TEXT,
+    detailed_news TEXT,
+    attachments TEXT,
+    contacts TEXT,
+    duplicate_of TEXT,
+    scraping_date TEXT,
+    scraping_time TEXT
+);
+
+CREATE INDEX IF NOT EXISTS articles_source ON articles (source, published_at);
+CREATE INDEX IF NOT EXISTS articles_category ON articles (category, published_at);
+CREATE INDEX IF NOT EXISTS articles_published_at ON articles (published_at);
+CREATE INDEX IF NOT EXISTS articles_scraping_date ON articles (scraping_date);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, abstract, detailed_news,
+    content='articles', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, abstract, detailed_news)
+    VALUES (new.id, new.title, new.abstract, new.detailed_news);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, abstract, detailed_news)
+    VALUES ('delete', old.id, old.title, old.abstract, old.detailed_news);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, abstract, detailed_news)
+    VALUES ('delete', old.id, old.title, old.abstract, old.detailed_news);
+    INSERT INTO articles_fts (rowid, title, abstract, detailed_news)
+    VALUES (new.id, new.title, new.abstract, new.detailed_news);
+END;
+"""
+
+def published_at(published_date):
+    """Sortable 'YYYY-MM-DD HH:MM' form of a parsed published_date, or None"""
+    try:
+        return datetime.strptime(published_date, OUTPUT_FORMAT).strftime('%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return None
+
+def _row(record):
+    values = dict(record)
+    values['published_at'] = published_at(values.get('published_date'))
+    row = []
+    for column in COLUMNS:
+        value = values.get(column)
+        # Attachments and contacts can be lists in some sources
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        row.append(value)
+    return row
+
+class SQLiteArticleStore:
+    """Article archive in SQLite with filter indexes and an FTS5 index over the text fields"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def write_batch(self, records):
+        """Insert or update a batch of news_details records in one transaction"""
+        if not records:
+            return 0
+        updates = ', '.join(f'{column} = excluded.{column}' for column in COLUMNS if column != 'article_url')
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO articles ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                f"ON CONFLICT (article_url) DO UPDATE SET {updates}",
+                [_row(record) for record in records]
+            )
+        return len(records)
+
+    def import_directory(self, data_dir, batch_size=1000):
+        """Load every <source>.json and <source>.jsonl under a Data directory"""
+        total = 0
+        for path in sorted(Path(data_dir).glob('*/*.json*')):
+            try:
+                if path.suffix == '.jsonl':
+                    with open(path, 'r', encoding='utf-8') as f:
+                        records = [json.loads(line) for line in f if line.strip()]
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        records = json.load(f)
+            except Exception as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            records = [r for r in records if isinstance(r, dict) and r.get('article_url')]
+            for start in range(0, len(records), batch_size):
+                total += self.write_batch(records[start:start + batch_size])
+        return total
+
+    def query(self, text=None, source=None, category=None, since=None, until=None, scraped_on=None, limit=20):
+        """Filter and full-text search; results are best match first, or newest first without text"""
+        conditions = []
+        params = []
+        if text:
+            conditions.append('articles_fts MATCH ?')
+            params.append(text)
+        for column, value in (('a.source', source), ('a.category', category), ('a.scraping_date', scraped_on)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if since:
+            conditions.append('a.published_at >= ?')
+            params.append(since)
+        if until:
+            # A bare date includes the whole day
+            conditions.append('a.published_at <= ?')
+            params.append(until if len(until) > 10 else f'{until} 23:59')
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if text:
+            sql = (
+                "SELECT a.source, a.category, a.published_date, a.title, a.article_url, "
+                "snippet(articles_fts, 2, '[', ']', '...', 16) AS snippet "
+                f"FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid {where} "
+                "ORDER BY bm25(articles_fts) LIMIT ?"
+            )
+        else:
+            sql = (
+                "SELECT a.source, a.category, a.published_date, a.title, a.article_url, a.abstract AS snippet "
+                f"FROM articles a {where} ORDER BY a.published_at DESC LIMIT ?"
+            )
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,96 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    url TEXT PRIMARY KEY,
+    source_name TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS pending_source ON pending (source_name, priority);
+
+CREATE TABLE IF NOT EXISTS sources (
+    source_name TEXT PRIMARY KEY,
+    started_at REAL NOT NULL
+);
+"""
+
+class CrawlFrontier:
+    """Requests discovered but not yet finished, persisted so an interrupted crawl can resume
+
+    A request is added when it is discovered and removed once its work is
+    on disk (a catalog page when its links have been added, an article when
+    the pipeline has written it) or once it has failed for good. Every
+    change is committed immediately, so the frontier survives a crash.
+    Payloads are plain JSON (URL, callback and errback names, cb_kwargs,
+    meta), never live objects. A job that finishes cleanly is forgotten.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def start(self, source_names):
+        """Forget any earlier job for these sources and start a new one"""
+        now = time.time()
+        with self._lock, self.conn:
+            for source_name in source_names:
+                self.conn.execute('DELETE FROM pending WHERE source_name = ?', (source_name,))
+                self.conn.execute('INSERT OR REPLACE INTO sources (source_name, started_at) VALUES (?, ?)',
+                                  (source_name, now))
+
+    def started(self, source_name):
+        """Whether a job for the source is on record, even one with nothing left pending"""
+        with self._lock:
+            row = self.conn.execute('SELECT 1 FROM sources WHERE source_name = ?', (source_name,)).fetchone()
+        return row is not None
+
+    def pending(self, source_name):
+        """Payloads still pending for a source, highest priority first"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT payload FROM pending WHERE source_name = ? ORDER BY priority DESC, added_at',
+                (source_name,)
+            ).fetchall()
+        return [json.loads(payload) for payload, in rows]
+
+    def update(self, added=(), completed=()):
+        """Add discovered payloads and drop finished URLs in one transaction"""
+        now = time.time()
+        with self._lock, self.conn:
+            if completed:
+                self.conn.executemany('DELETE FROM pending WHERE url = ?', ((url,) for url in completed))
+            if added:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO pending (url, source_name, priority, payload, added_at) VALUES (?, ?, ?, ?, ?)',
+                    ((payload['url'], payload['meta']['source_name'], payload['priority'], json.dumps(payload), now)
+                     for payload in added)
+                )
+
+    def complete(self, urls):
+        self.update(completed=urls)
+
+    def finish(self, source_names):
+        """Forget the jobs of sources whose crawl ran to the end"""
+        with self._lock, self.conn:
+            for source_name in source_names:
+                self.conn.execute('DELETE FROM pending WHERE source_name = ?', (source_name,))
+                self.conn.execute('DELETE FROM sources WHERE source_name = ?', (source_name,))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,58 @@
+import json
+import logging
+from pathlib import Path
+from utils.file_lock import FileLock, lock_path
+
+logger = logging.getLogger(__name__)
+
+class FeedWatermarkStore:
+    """Newest entry date and lastmod per feed or sitemap URL, persisted as JSON
+
+    Values are ISO 8601 UTC strings, which compare in date order.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = self._read()
+        self.dirty = set()
+
+    def _read(self):
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Couldn't load feed watermarks {self.path}, starting fresh: {e}")
+            return {}
+
+    def get(self, url, field='newest'):
+        return self.entries.get(url, {}).get(field)
+
+    def advance(self, url, field, value):
+        """Raise a watermark; it never moves backwards"""
+        if value and value > (self.get(url, field) or ''):
+            self.entries.setdefault(url, {})[field] = value
+            self.dirty.add(url)
+
+    def save(self):
+        """Merge our changed entries into the file on disk, under a lock shared with other shards"""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with FileLock(lock_path(self.path)):
+                entries = self._read()
+                for url in self.dirty:
+                    merged = entries.setdefault(url, {})
+                    for field, value in self.entries[url].items():
+                        merged[field] = max(value, merged.get(field) or '')
+                temp_path = self.path.with_suffix('.tmp')
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, indent=4)
+                temp_path.replace(self.path)
+            self.entries = entries
+            self.dirty.clear()
+            logger.info(f"Saved watermarks for {len(self.entries)} feeds to {self.path}")
+        except Exception as e:
+            logger.error(f"Error saving feed watermarks {self.path}: {e}")
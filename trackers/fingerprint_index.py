@@ -0,0 +1,383 @@
+import array
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'CIFPIDX1'
+INDEX_HEADER = struct.Struct('<8sQd')  # magic, entry count, last eviction time
+BLOOM_MAGIC = b'CIBLOOM1'
+BLOOM_HEADER = struct.Struct('<8sQQI')  # magic, entry count, bits, hash count
+LOG_RECORD = struct.Struct('<QI')  # fingerprint, first-seen (0 marks a removal)
+
+TOMBSTONE = 0
+CHUNK_SIZE = 65536
+BLOOM_BITS_PER_ENTRY = 10
+BLOOM_HASHES = 7
+# A new Bloom filter is sized for this many times the entries it starts with, so merges can add to it
+BLOOM_HEADROOM = 2
+EVICTION_INTERVAL = 24 * 3600
+
+def url_fingerprint(url):
+    """64-bit fingerprint of a URL"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _bloom_positions(fp, bits, hashes):
+    h1 = fp & 0xFFFFFFFF
+    h2 = (fp >> 32) | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+def _bloom_add(data, bits, hashes, fps):
+    for fp in fps:
+        for pos in _bloom_positions(fp, bits, hashes):
+            data[pos >> 3] |= 1 << (pos & 7)
+
+class _SourceIndex:
+    """Sorted fingerprint array for one source, plus an append-only log of recent changes
+
+    The index file holds a header, then `count` sorted uint64 fingerprints,
+    then `count` uint32 first-seen timestamps, and is memory-mapped read-only.
+    Additions and removals go to the log and an in-memory delta until they
+    are merged into a new index file.
+    """
+
+    def __init__(self, index_dir, source_name, use_bloom=False):
+        self.index_path = index_dir / f"{source_name}.idx"
+        self.log_path = index_dir / f"{source_name}.log"
+        self.bloom_path = index_dir / f"{source_name}.bloom"
+        self.use_bloom = use_bloom
+        self.lock = threading.Lock()
+        self.delta = {}
+        self._open_index()
+        self._replay_log()
+        self.log = open(self.log_path, 'ab')
+
+    def _open_index(self, bloom=None):
+        self.count = 0
+        self.last_evicted = 0.0
+        self.fps = None
+        self.first_seen = None
+        self.bloom = None
+        self._mmap = None
+        self._view = None
+
+        if not self.index_path.exists() or self.index_path.stat().st_size < INDEX_HEADER.size:
+            return
+
+        with open(self.index_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, last_evicted = INDEX_HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or len(self._mmap) != INDEX_HEADER.size + 12 * count:
+            # The next merge replaces it with the entries still in the log
+            logger.error(f"Invalid or truncated fingerprint index {self.index_path}, ignoring it")
+            self._mmap.close()
+            self._mmap = None
+            return
+
+        fps_end = INDEX_HEADER.size + 8 * count
+        self._view = memoryview(self._mmap)
+        self.fps = self._view[INDEX_HEADER.size:fps_end].cast('Q')
+        self.first_seen = self._view[fps_end:fps_end + 4 * count].cast('I')
+        self.count = count
+        self.last_evicted = last_evicted
+
+        if self.use_bloom:
+            if bloom is not None:
+                self.bloom = bloom
+            else:
+                self._open_bloom()
+
+    def _close_index(self):
+        for view in (self.fps, self.first_seen, self._view):
+            if view is not None:
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self.fps = self.first_seen = self._view = self._mmap = None
+
+    def _open_bloom(self):
+        try:
+            data = self.bloom_path.read_bytes() if self.bloom_path.exists() else b''
+            if len(data) >= BLOOM_HEADER.size:
+                magic, count, bits, hashes = BLOOM_HEADER.unpack_from(data, 0)
+                if (magic == BLOOM_MAGIC and count == self.count
+                        and len(data) == BLOOM_HEADER.size + (bits + 7) // 8):
+                    self.bloom = (bytearray(data[BLOOM_HEADER.size:]), bits, hashes)
+                    return
+            self._build_bloom()
+        except Exception as e:
+            logger.warning(f"Bloom filter unavailable for {self.index_path}: {e}")
+            self.bloom = None
+
+    def _build_bloom(self):
+        """Build the Bloom filter over the fingerprints in the index file"""
+        bits = max(64, self.count * BLOOM_BITS_PER_ENTRY * BLOOM_HEADROOM)
+        data = bytearray((bits + 7) // 8)
+        for start in range(0, self.count, CHUNK_SIZE):
+            _bloom_add(data, bits, BLOOM_HASHES, self.fps[start:start + CHUNK_SIZE].tolist())
+        self.bloom = (data, bits, BLOOM_HASHES)
+        self._write_bloom(self.count)
+
+    def _write_bloom(self, count):
+        data, bits, hashes = self.bloom
+        temp_path = self.bloom_path.with_suffix('.bloom.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, count, bits, hashes))
+            f.write(data)
+        temp_path.replace(self.bloom_path)
+
+    def _grown_bloom(self, count):
+        """The current Bloom filter with the delta's additions set, or None if it must be rebuilt
+
+        Removed and evicted fingerprints keep their bits; that only costs the
+        occasional extra bisect. A filter that has outgrown its size is rebuilt.
+        """
+        if self.bloom is None:
+            return None
+        data, bits, hashes = self.bloom
+        if count > bits // BLOOM_BITS_PER_ENTRY:
+            return None
+        _bloom_add(data, bits, hashes, (fp for fp, ts in self.delta.items() if ts != TOMBSTONE))
+        return self.bloom
+
+    def _replay_log(self):
+        if not self.log_path.exists():
+            return
+        data = self.log_path.read_bytes()
+        usable = len(data) - len(data) % LOG_RECORD.size
+        for fp, ts in LOG_RECORD.iter_unpack(data[:usable]):
+            self.delta[fp] = ts
+        if usable != len(data):
+            # Drop a record torn by a crash
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(usable)
+
+    def _in_index(self, fp):
+        if not self.count:
+            return False
+        if self.bloom is not None:
+            data, bits, hashes = self.bloom
+            for pos in _bloom_positions(fp, bits, hashes):
+                if not data[pos >> 3] & (1 << (pos & 7)):
+                    return False
+        i = bisect.bisect_left(self.fps, fp)
+        return i < self.count and self.fps[i] == fp
+
+    def contains(self, fp):
+        ts = self.delta.get(fp)
+        if ts is not None:
+            return ts != TOMBSTONE
+        return self._in_index(fp)
+
+    def add(self, fps, first_seen):
+        records = bytearray()
+        for fp in fps:
+            if self.contains(fp):
+                continue
+            self.delta[fp] = first_seen
+            records += LOG_RECORD.pack(fp, first_seen)
+        self._append_log(records)
+        return len(records) // LOG_RECORD.size
+
+    def remove(self, fp):
+        if not self.contains(fp):
+            return
+        self.delta[fp] = TOMBSTONE
+        self._append_log(LOG_RECORD.pack(fp, TOMBSTONE))
+
+    def _append_log(self, records):
+        if records:
+            self.log.write(records)
+            self.log.flush()
+            os.fsync(self.log.fileno())
+
+    def _iter_index(self):
+        for start in range(0, self.count, CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            yield from zip(self.fps[start:end].tolist(), self.first_seen[start:end].tolist())
+
+    def _iter_merged(self):
+        """Merge the index with the delta; delta removals win, index first-seen times are kept"""
+        main = self._iter_index()
+        delta = iter(sorted(self.delta.items()))
+        m = next(main, None)
+        d = next(delta, None)
+        while m is not None or d is not None:
+            if d is None or (m is not None and m[0] < d[0]):
+                yield m
+                m = next(main, None)
+            elif m is None or d[0] < m[0]:
+                yield d
+                d = next(delta, None)
+            else:
+                yield d if d[1] == TOMBSTONE else m
+                m = next(main, None)
+                d = next(delta, None)
+
+    def merge(self, cutoff=None):
+        """Write a new index from the index and delta, dropping entries first seen before cutoff"""
+        if not self.delta and cutoff is None:
+            return 0
+
+        temp_path = self.index_path.with_suffix('.idx.tmp')
+        ts_temp_path = self.index_path.with_suffix('.ts.tmp')
+        count = 0
+        evicted = 0
+        with open(temp_path, 'wb') as fp_out, open(ts_temp_path, 'w+b') as ts_out:
+            fp_out.write(INDEX_HEADER.pack(INDEX_MAGIC, 0, 0.0))
+            fp_buf = array.array('Q')
+            ts_buf = array.array('I')
+            for fp, ts in self._iter_merged():
+                if ts == TOMBSTONE:
+                    continue
+                if cutoff is not None and ts < cutoff:
+                    evicted += 1
+                    continue
+                fp_buf.append(fp)
+                ts_buf.append(ts)
+                if len(fp_buf) >= CHUNK_SIZE:
+                    count += len(fp_buf)
+                    fp_buf.tofile(fp_out)
+                    ts_buf.tofile(ts_out)
+                    fp_buf = array.array('Q')
+                    ts_buf = array.array('I')
+            count += len(fp_buf)
+            fp_buf.tofile(fp_out)
+            ts_buf.tofile(ts_out)
+
+            ts_out.seek(0)
+            while True:
+                chunk = ts_out.read(1 << 20)
+                if not chunk:
+                    break
+                fp_out.write(chunk)
+
+            last_evicted = time.time() if cutoff is not None else self.last_evicted
+            fp_out.seek(0)
+            fp_out.write(INDEX_HEADER.pack(INDEX_MAGIC, count, last_evicted))
+            fp_out.flush()
+            os.fsync(fp_out.fileno())
+        ts_temp_path.unlink()
+
+        bloom = self._grown_bloom(count) if self.use_bloom else None
+        self._close_index()
+        # A Bloom filter left over from the old index could give false negatives
+        self.bloom_path.unlink(missing_ok=True)
+        temp_path.replace(self.index_path)
+        if bloom is not None:
+            self.bloom = bloom
+            self._write_bloom(count)
+
+        # The log is only cleared once the new index is in place
+        self.log.close()
+        with open(self.log_path, 'wb') as f:
+            os.fsync(f.fileno())
+        self.log = open(self.log_path, 'ab')
+        self.delta = {}
+
+        self._open_index(bloom)
+        return evicted
+
+    def close(self):
+        self.log.close()
+        self._close_index()
+
+class FingerprintTracker:
+    """Seen-URL store of 64-bit URL fingerprints in sorted, memory-mapped per-source files
+
+    A merge rewrites a source's whole index, so the delta may grow to
+    merge_ratio of the index before one happens (and to at least
+    merge_threshold entries). The work of all merges then stays linear in
+    the number of URLs added instead of quadratic.
+    """
+
+    def __init__(self, index_dir, use_bloom=False, merge_threshold=4096, merge_ratio=0.1):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.use_bloom = use_bloom
+        self.merge_threshold = merge_threshold
+        self.merge_ratio = merge_ratio
+        self.indexes = {}
+        self._lock = threading.Lock()
+
+    def _get_index(self, source_name):
+        with self._lock:
+            if source_name not in self.indexes:
+                self.indexes[source_name] = _SourceIndex(self.index_dir, source_name, self.use_bloom)
+            return self.indexes[source_name]
+
+    def contains(self, source_name, url):
+        """Check if a URL has been seen for a source"""
+        index = self._get_index(source_name)
+        with index.lock:
+            return index.contains(url_fingerprint(url))
+
+    def add_urls(self, source_name, urls, first_seen=None):
+        """Record a batch of URLs for a source"""
+        index = self._get_index(source_name)
+        first_seen = int(first_seen or time.time())
+        with index.lock:
+            index.add([url_fingerprint(url) for url in urls], first_seen)
+            if len(index.delta) >= max(self.merge_threshold, self.merge_ratio * index.count):
+                index.merge()
+
+    def remove_url(self, source_name, url):
+        """Remove a URL for a source"""
+        index = self._get_index(source_name)
+        with index.lock:
+            index.remove(url_fingerprint(url))
+
+    def count(self, source_name):
+        """Approximate number of URLs tracked for a source"""
+        index = self._get_index(source_name)
+        with index.lock:
+            added = sum(1 for ts in index.delta.values() if ts != TOMBSTONE)
+            return index.count + added
+
+    def evict(self, source_name, cutoff):
+        """Drop URLs first seen before cutoff, at most once per eviction interval"""
+        index = self._get_index(source_name)
+        with index.lock:
+            if time.time() - index.last_evicted < EVICTION_INTERVAL:
+                return 0
+            return index.merge(cutoff=int(cutoff))
+
+    def import_json_tracker(self, source_name, tracker_file):
+        """Import a legacy <source>_tracker.json file once"""
+        tracker_file = Path(tracker_file)
+        marker = self.index_dir / f"{source_name}.imported"
+        if marker.exists() or not tracker_file.exists():
+            return 0
+
+        try:
+            with open(tracker_file, 'r', encoding='utf-8') as f:
+                urls = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading legacy tracker {tracker_file}: {e}")
+            return 0
+
+        index = self._get_index(source_name)
+        with index.lock:
+            # The file's mtime is the best first-seen time we have for its URLs
+            index.add([url_fingerprint(url) for url in urls], int(tracker_file.stat().st_mtime))
+            index.merge()
+        marker.write_text(str(tracker_file), encoding='utf-8')
+        logger.info(f"Imported {len(urls)} URLs for {source_name} from {tracker_file}")
+        return len(urls)
+
+    def close(self):
+        with self._lock:
+            for index in self.indexes.values():
+                with index.lock:
+                    if index.delta:
+                        index.merge()
+                    index.close()
+            self.indexes = {}
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    fingerprint INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    source TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS articles_seen_at ON articles (seen_at);
+
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (band, value, article_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def normalize_text(text):
+    """Lowercased word tokens, so markup, punctuation and spacing don't change the hash"""
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+def simhash(text):
+    """64-bit SimHash over word 3-shingles of text, or None when there is nothing to hash"""
+    tokens = normalize_text(text)
+    if not tokens:
+        return None
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = [' '.join(tokens)]
+    else:
+        shingles = [' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+    # Count byte values per position instead of looping over 64 bits per shingle
+    byte_counts = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=FINGERPRINT_BITS // 8).digest()
+        for position, value in enumerate(digest):
+            byte_counts[position][value] += 1
+
+    fingerprint = 0
+    half = len(shingles) / 2
+    for position, counts in enumerate(byte_counts):
+        for bit in range(8):
+            ones = sum(count for value, count in enumerate(counts) if count and value >> bit & 1)
+            if ones > half:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+class SimHashIndex:
+    """Banded LSH index of article SimHashes in SQLite for near-duplicate lookups
+
+    The 64-bit fingerprint is split into max_distance + 1 bands. Two
+    fingerprints within max_distance bits must agree exactly on at least one
+    band, so a lookup is max_distance + 1 indexed queries followed by a
+    Hamming check of the few candidates found.
+    """
+
+    def __init__(self, db_path, max_distance=3, window_days=7):
+        self.db_path = Path(db_path)
+        self.max_distance = max_distance
+        self.window = window_days * 86400 if window_days else None
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._check_layout()
+        logger.info(f"Opened SimHash index at {self.db_path} ({self.bands} bands of {self.band_bits} bits)")
+
+    def _check_layout(self):
+        """Rebuild the bands table if the index was written with a different band count"""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'bands'").fetchone()
+            if row and int(row[0]) == self.bands:
+                return
+            self.conn.execute('DELETE FROM bands')
+            rows = self.conn.execute('SELECT id, fingerprint FROM articles').fetchall()
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO bands (band, value, article_id) VALUES (?, ?, ?)',
+                ((band, value, article_id) for article_id, fingerprint in rows
+                 for band, value in self._band_values(_to_unsigned(fingerprint)))
+            )
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bands', ?)", (str(self.bands),))
+        if row:
+            logger.info(f"Re-banded {len(rows)} fingerprints for max_distance={self.max_distance}")
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            # The last band takes any bits left over by the division; with a
+            # single band that is the whole fingerprint, past SQLite's range
+            if band == self.bands - 1:
+                yield band, _to_signed(fingerprint >> (band * self.band_bits))
+            else:
+                yield band, (fingerprint >> (band * self.band_bits)) & mask
+
+    def find(self, fingerprint, now=None):
+        """Closest indexed article within max_distance and the time window, as (url, source, distance)"""
+        now = now or time.time()
+        cutoff = now - self.window if self.window else 0
+        best = None
+        seen = set()
+        with self._lock:
+            for band, value in self._band_values(fingerprint):
+                rows = self.conn.execute(
+                    'SELECT a.id, a.fingerprint, a.url, a.source FROM bands b '
+                    'JOIN articles a ON a.id = b.article_id '
+                    'WHERE b.band = ? AND b.value = ? AND a.seen_at >= ?',
+                    (band, value, cutoff)
+                ).fetchall()
+                for article_id, candidate, url, source in rows:
+                    if article_id in seen:
+                        continue
+                    seen.add(article_id)
+                    distance = hamming_distance(fingerprint, _to_unsigned(candidate))
+                    if distance <= self.max_distance and (best is None or distance < best[2]):
+                        best = (url, source, distance)
+        return best
+
+    def add(self, fingerprint, url, source, now=None):
+        """Index an article's fingerprint"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO articles (fingerprint, url, source, seen_at) VALUES (?, ?, ?, ?)',
+                (_to_signed(fingerprint), url, source, now or time.time())
+            )
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO bands (band, value, article_id) VALUES (?, ?, ?)',
+                ((band, value, cursor.lastrowid) for band, value in self._band_values(fingerprint))
+            )
+
+    def evict(self, cutoff=None):
+        """Drop articles older than the time window"""
+        if cutoff is None:
+            if not self.window:
+                return 0
+            cutoff = time.time() - self.window
+        with self._lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM bands WHERE article_id IN (SELECT id FROM articles WHERE seen_at < ?)', (cutoff,)
+            )
+            cursor = self.conn.execute('DELETE FROM articles WHERE seen_at < ?', (cutoff,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
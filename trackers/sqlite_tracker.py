@@ -0,0 +1,109 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_urls (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (source, url)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    url_count INTEGER NOT NULL,
+    imported_at REAL NOT NULL
+);
+"""
+
+class SQLiteTracker:
+    """Seen-URL store backed by one indexed SQLite table keyed by (source, url)"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        logger.info(f"Opened URL tracker database at {self.db_path}")
+
+    def contains(self, source_name, url):
+        """Check if a URL has been seen for a source"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM seen_urls WHERE source = ? AND url = ?', (source_name, url)
+            ).fetchone()
+        return row is not None
+
+    def add_urls(self, source_name, urls):
+        """Insert a batch of URLs for a source in a single transaction"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen_urls (source, url, first_seen) VALUES (?, ?, ?)',
+                ((source_name, url, now) for url in urls)
+            )
+
+    def remove_url(self, source_name, url):
+        """Remove a URL for a source"""
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM seen_urls WHERE source = ? AND url = ?', (source_name, url))
+
+    def count(self, source_name):
+        """Number of URLs tracked for a source"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM seen_urls WHERE source = ?', (source_name,)
+            ).fetchone()[0]
+
+    def evict(self, source_name, cutoff):
+        """Drop URLs first seen before cutoff"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'DELETE FROM seen_urls WHERE source = ? AND first_seen < ?', (source_name, cutoff)
+            )
+        return cursor.rowcount
+
+    def import_json_tracker(self, source_name, tracker_file):
+        """Import a legacy <source>_tracker.json file once"""
+        tracker_file = Path(tracker_file)
+        with self._lock:
+            imported = self.conn.execute(
+                'SELECT 1 FROM imports WHERE source = ?', (source_name,)
+            ).fetchone()
+        if imported or not tracker_file.exists():
+            return 0
+
+        try:
+            with open(tracker_file, 'r', encoding='utf-8') as f:
+                urls = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading legacy tracker {tracker_file}: {e}")
+            return 0
+
+        # The file's mtime is the best first-seen time we have for its URLs
+        first_seen = tracker_file.stat().st_mtime
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen_urls (source, url, first_seen) VALUES (?, ?, ?)',
+                ((source_name, url, first_seen) for url in urls)
+            )
+            self.conn.execute(
+                'INSERT INTO imports (source, file, url_count, imported_at) VALUES (?, ?, ?, ?)',
+                (source_name, str(tracker_file), len(urls), now)
+            )
+        logger.info(f"Imported {len(urls)} URLs for {source_name} from {tracker_file}")
+        return len(urls)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
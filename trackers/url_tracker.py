@@ -1,53 +1,87 @@
-import json
 from pathlib import Path
 import logging
+import threading
+import time
+from trackers.sqlite_tracker import SQLiteTracker
 
 logger = logging.getLogger(__name__)
 
 class URLTracker:
-    def __init__(self, tracker_dir):
+    def __init__(self, tracker_dir, backend=None):
         self.tracker_dir = Path(tracker_dir)
         self.tracker_dir.mkdir(exist_ok=True)
-        self.trackers = {}
+        self.backend = backend or SQLiteTracker(self.tracker_dir / 'url_tracker.db')
+        # URLs added since the last save, committed in one transaction per source
+        self.pending = {}
+        self._lock = threading.Lock()
 
-    def load_tracker(self, source_name):
-        """Load URL tracker for a source"""
+    def load_tracker(self, source_name, retention_days=None):
+        """Prepare the tracker for a source, importing its legacy JSON file once
+        and evicting URLs older than the retention window"""
         tracker_file = self.tracker_dir / f"{source_name}_tracker.json"
         try:
-            if tracker_file.exists():
-                with open(tracker_file, 'r', encoding='utf-8') as f:
-                    self.trackers[source_name] = set(json.load(f))
-            else:
-                self.trackers[source_name] = set()
-            return self.trackers[source_name]
+            self.backend.import_json_tracker(source_name, tracker_file)
+            if retention_days:
+                evicted = self.backend.evict(source_name, time.time() - retention_days * 86400)
+                if evicted:
+                    logger.info(f"Evicted {evicted} URLs older than {retention_days} days for {source_name}")
         except Exception as e:
             logger.error(f"Error loading tracker for {source_name}: {e}")
-            return set()
+        with self._lock:
+            self.pending.setdefault(source_name, set())
 
-    def save_tracker(self, source_name):
-        """Save URL tracker for a source"""
-        if source_name not in self.trackers:
-            return
+    def save_tracker(self, source_name, urls=None):
+        """Commit URLs added for a source, or just the given ones, since the last save"""
+        with self._lock:
+            pending = self.pending.setdefault(source_name, set())
+            if urls is None:
+                urls = set(pending)
+            else:
+                urls = set(urls) & pending
+            if not urls:
+                return
+            pending -= urls
 
-        tracker_file = self.tracker_dir / f"{source_name}_tracker.json"
         try:
-            with open(tracker_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.trackers[source_name]), f, indent=4)
-            logger.info(f"Updated tracker for {source_name}")
+            self.backend.add_urls(source_name, urls)
+            logger.info(f"Updated tracker for {source_name} with {len(urls)} URLs")
         except Exception as e:
             logger.error(f"Error saving tracker for {source_name}: {e}")
+            with self._lock:
+                self.pending.setdefault(source_name, set()).update(urls)
+
+    def save_all(self):
+        """Commit pending URLs for every source"""
+        for source_name in list(self.pending):
+            self.save_tracker(source_name)
 
     def add_url(self, source_name, url):
         """Add URL to tracker"""
-        if source_name not in self.trackers:
-            self.load_tracker(source_name)
-        self.trackers[source_name].add(url)
+        with self._lock:
+            self.pending.setdefault(source_name, set()).add(url)
 
     def remove_url(self, source_name, url):
         """Remove URL from tracker"""
-        if source_name in self.trackers:
-            self.trackers[source_name].discard(url)
+        with self._lock:
+            if source_name in self.pending:
+                self.pending[source_name].discard(url)
+        try:
+            self.backend.remove_url(source_name, url)
+        except Exception as e:
+            logger.error(f"Error removing {url} from tracker for {source_name}: {e}")
 
     def url_exists(self, source_name, url):
         """Check if URL exists in tracker"""
-        return source_name in self.trackers and url in self.trackers[source_name]
+        with self._lock:
+            if url in self.pending.get(source_name, ()):
+                return True
+        return self.backend.contains(source_name, url)
+
+    def close(self):
+        """Close the backend, forgetting pending URLs whose records were never written"""
+        with self._lock:
+            leftover = sum(len(urls) for urls in self.pending.values())
+            self.pending.clear()
+        if leftover:
+            logger.info(f"Discarding {leftover} tracked URLs that were not stored; they are retried next run")
+        self.backend.close()
@@ -1,39 +1,52 @@
 import re
+from collections import OrderedDict
 from dateutil import parser
 from datetime import datetime, timedelta
 import pytz
 
-def parse_relative_dates(date_str):
-    now = datetime.now(pytz.UTC)
-    date_str = re.sub(r'\babout\b|\balmost\b|\bnearly\b', '', date_str).strip()
+OUTPUT_FORMAT = '%d/%m/%Y %H:%M'
 
-    hours_match = re.search(r'(\d+)\s*hours?\s*ago', date_str)
-    if hours_match:
-        hours = int(hours_match.group(1))
-        return now - timedelta(hours=hours)
+RELATIVE_FILLER_PATTERN = re.compile(r'\babout\b|\balmost\b|\bnearly\b')
+RELATIVE_PATTERNS = [
+    (re.compile(r'(\d+)\s*hours?\s*ago'), 'hours'),
+    (re.compile(r'(\d+)\s*minutes?\s*ago'), 'minutes'),
+    (re.compile(r'(\d+)\s*days?\s*ago'), 'days'),
+    (re.compile(r'(\d+)\s*weeks?\s*ago'), 'weeks'),
+]
+RELATIVE_MARKERS = ('ago', 'yesterday', 'last week')
+NOISE_PATTERN = re.compile(r"\bat\b|\bUpdated On\b|\bPublished\b|\bon\b", re.IGNORECASE)
+TIMEZONE_PATTERN = re.compile(r'\b(IST|ET|GMT|UTC)\b')
 
-    minutes_match = re.search(r'(\d+)\s*minutes?\s*ago', date_str)
-    if minutes_match:
-        minutes = int(minutes_match.group(1))
-        return now - timedelta(minutes=minutes)
+# strptime layouts tried when learning a source's date format. Numeric day/month
+# layouts like %m/%d/%Y are left out: which one a source would learn depends
+# on the first date it sends, so those always go through dateutil
+CANDIDATE_FORMATS = [
+    '%b %d, %Y, %H:%M', '%b %d, %Y %H:%M', '%B %d, %Y, %H:%M', '%B %d, %Y %H:%M',
+    '%b %d, %Y, %I:%M %p', '%b %d, %Y %I:%M %p', '%B %d, %Y, %I:%M %p', '%B %d, %Y %I:%M %p',
+    '%b %d, %Y', '%B %d, %Y', '%A, %B %d, %Y', '%a, %b %d, %Y',
+    '%d %b %Y', '%d %B %Y', '%d %b, %Y', '%d %B, %Y', '%d %b %Y %H:%M', '%d %B %Y %H:%M',
+    '%a, %d %b %Y %H:%M:%S', '%a, %d %b %Y %H:%M',
+    '%Y-%m-%d', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y/%m/%d',
+]
+MAX_LEARNED_FORMATS = 4
 
-    days_match = re.search(r'(\d+)\s*days?\s*ago', date_str)
-    if days_match:
-        days = int(days_match.group(1))
-        return now - timedelta(days=days)
+def parse_relative_dates(date_str):
+    now = datetime.now(pytz.UTC)
+    date_str = RELATIVE_FILLER_PATTERN.sub('', date_str).strip()
 
-    weeks_match = re.search(r'(\d+)\s*weeks?\s*ago', date_str)
-    if weeks_match:
-        weeks = int(weeks_match.group(1))
-        return now - timedelta(weeks=weeks)
+    for pattern, unit in RELATIVE_PATTERNS:
+        match = pattern.search(date_str)
+        if match:
+            return now - timedelta(**{unit: int(match.group(1))})
 
-    if "yesterday" in date_str.lower():
+    lowered = date_str.lower()
+    if "yesterday" in lowered:
         return now - timedelta(days=1)
-    if "last week" in date_str.lower():
+    if "last week" in lowered:
         return now - timedelta(weeks=1)
-    if "a day ago" in date_str.lower():
+    if "a day ago" in lowered:
         return now - timedelta(days=1)
-    if "a week ago" in date_str.lower():
+    if "a week ago" in lowered:
         return now - timedelta(weeks=1)
 
     return None
@@ -47,25 +60,87 @@ def get_timezone(timezone_str):
     }
     return pytz.timezone(timezone_map.get(timezone_str, 'UTC'))
 
-def parse_date(date_str):
-    date_str = date_str.strip()
-    relative_date = parse_relative_dates(date_str)
-    if relative_date:
-        return relative_date.strftime('%d/%m/%Y %H:%M')
+class DateParser:
+    """Date parser that learns each source's strptime layout and memoizes results
+
+    Relative dates ("3 hours ago") depend on the current time, so they are
+    never cached. Absolute dates are tried against the formats learned for
+    the source before falling back to dateutil's fuzzy parser; a successful
+    fuzzy parse teaches the source whichever candidate layout reproduces it.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.learned_formats = {}
+
+    def parse(self, date_str, source=None):
+        date_str = date_str.strip()
+        lowered = date_str.lower()
+        if any(marker in lowered for marker in RELATIVE_MARKERS):
+            relative_date = parse_relative_dates(date_str)
+            if relative_date:
+                return relative_date.strftime(OUTPUT_FORMAT)
 
-    date_str = re.sub(r"\bat\b|\bUpdated On\b|\bPublished\b|\bon\b", '', date_str, flags=re.IGNORECASE).strip()
-    timezone_match = re.search(r'\b(IST|ET|GMT|UTC)\b', date_str)
-    timezone = timezone_match.group(1) if timezone_match else None
-    date_str = re.sub(r"\b(IST|ET|GMT|UTC)\b", '', date_str).strip()
+        key = (source, date_str)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
 
-    try:
-        parsed_date = parser.parse(date_str, fuzzy=True)
+        result = self._parse_absolute(date_str, source)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def _parse_absolute(self, date_str, source):
+        date_str = NOISE_PATTERN.sub('', date_str).strip()
+        timezone_match = TIMEZONE_PATTERN.search(date_str)
+        timezone = timezone_match.group(1) if timezone_match else None
+        date_str = TIMEZONE_PATTERN.sub('', date_str).strip()
+        normalized = ' '.join(date_str.split()).strip(' ,')
+
+        parsed_date = self._parse_learned(normalized, source)
+        if parsed_date is None:
+            try:
+                parsed_date = parser.parse(date_str, fuzzy=True)
+            except (parser.ParserError, ValueError, OverflowError):
+                return f"Unrecognized format: {date_str}"
+            if source is not None:
+                self._learn(normalized, parsed_date, source)
 
         if timezone:
             tz = get_timezone(timezone)
-            parsed_date = tz.localize(parsed_date)
+            parsed_date = tz.localize(parsed_date.replace(tzinfo=None))
             parsed_date = parsed_date.astimezone(pytz.UTC)
 
-        return parsed_date.strftime('%d/%m/%Y %H:%M')
-    except (parser.ParserError, ValueError):
-        return f"Unrecognized format: {date_str}"
+        return parsed_date.strftime(OUTPUT_FORMAT)
+
+    def _parse_learned(self, date_str, source):
+        """Try the formats learned for a source, in the order they were learned"""
+        for date_format in self.learned_formats.get(source, ()):
+            try:
+                return datetime.strptime(date_str, date_format)
+            except ValueError:
+                continue
+        return None
+
+    def _learn(self, date_str, parsed_date, source):
+        """Remember the first candidate layout that reproduces dateutil's result"""
+        formats = self.learned_formats.setdefault(source, [])
+        if len(formats) >= MAX_LEARNED_FORMATS or parsed_date.tzinfo is not None:
+            return
+        for date_format in CANDIDATE_FORMATS:
+            if date_format in formats:
+                continue
+            try:
+                if datetime.strptime(date_str, date_format) == parsed_date:
+                    formats.append(date_format)
+                    return
+            except ValueError:
+                continue
+
+_default_parser = DateParser()
+
+def parse_date(date_str, source=None):
+    return _default_parser.parse(date_str, source)
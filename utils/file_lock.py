@@ -0,0 +1,70 @@
+import os
+import time
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+class FileLock:
+    """Exclusive inter-process lock on a sidecar file, usable as a context manager
+
+    Used around read-merge-write of state files that several shard processes
+    share (catalog cache, ScrapingBee key pool, source runtimes).
+    """
+
+    def __init__(self, path, timeout=60, poll_interval=0.05):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.handle = None
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, 'a+b')
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._lock()
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self.handle.close()
+                    self.handle = None
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(self.poll_interval)
+
+    def release(self):
+        if self.handle is None:
+            return
+        try:
+            self._unlock()
+        finally:
+            self.handle.close()
+            self.handle = None
+
+    def _lock(self):
+        if os.name == 'nt':
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(self):
+        if os.name == 'nt':
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+def lock_path(path):
+    """Sidecar lock file for a state file"""
+    path = Path(path)
+    return path.with_name(path.name + '.lock')
@@ -0,0 +1,64 @@
+import heapq
+import json
+import logging
+from pathlib import Path
+from utils.file_lock import FileLock, lock_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RUNTIMES_FILE = Path('Tracker') / 'source_runtimes.json'
+# Weight of the latest run in the smoothed per-source runtime
+RUNTIME_SMOOTHING = 0.5
+
+def load_runtimes(path=DEFAULT_RUNTIMES_FILE):
+    """Smoothed runtime in seconds per source from previous runs"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Couldn't load source runtimes {path}: {e}")
+        return {}
+
+def update_runtimes(observed, path=DEFAULT_RUNTIMES_FILE):
+    """Fold this run's per-source runtimes into the stored averages"""
+    if not observed:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(lock_path(path)):
+        runtimes = load_runtimes(path)
+        for source_name, seconds in observed.items():
+            previous = runtimes.get(source_name)
+            runtimes[source_name] = round(
+                seconds if previous is None else RUNTIME_SMOOTHING * seconds + (1 - RUNTIME_SMOOTHING) * previous, 3
+            )
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(runtimes, f, indent=4, sort_keys=True)
+        temp_path.replace(path)
+
+def runtimes_from_stats(stats):
+    """Pick the source_runtime/<source> values out of a crawl's stats"""
+    prefix = 'source_runtime/'
+    return {key[len(prefix):]: value for key, value in stats.items() if key.startswith(prefix)}
+
+def balance_shards(source_names, runtimes, workers):
+    """Split sources into shards with longest-processing-time-first greedy assignment
+
+    Sources without history are costed at the median known runtime, or 1s.
+    """
+    known = sorted(runtimes[name] for name in source_names if name in runtimes)
+    default_cost = known[len(known) // 2] if known else 1.0
+    costs = {name: runtimes.get(name, default_cost) for name in source_names}
+
+    workers = max(1, min(workers, len(source_names)))
+    shards = [[] for _ in range(workers)]
+    heap = [(0.0, index) for index in range(workers)]
+    for name in sorted(source_names, key=lambda n: (-costs[n], n)):
+        load, index = heapq.heappop(heap)
+        shards[index].append(name)
+        heapq.heappush(heap, (load + costs[name], index))
+    return shards
@@ -0,0 +1,52 @@
+from urllib.parse import urlparse
+
+_SOURCE = object()
+_SOURCES = object()
+
+class URLRouter:
+    """Route URLs to sources with a host + path-prefix trie over configured URLs"""
+
+    def __init__(self, configs=None):
+        self.hosts = {}
+        for source_name, config in (configs or {}).items():
+            for url in config.get('url', []):
+                self.add(url, source_name)
+
+    @staticmethod
+    def _split(url):
+        """Split a URL into a normalized host and its non-empty path segments"""
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        return host, segments
+
+    def add(self, url, source_name):
+        """Register a configured URL for a source"""
+        host, segments = self._split(url)
+        node = self.hosts.setdefault(host, {_SOURCES: set()})
+        node[_SOURCES].add(source_name)
+        for segment in segments:
+            node = node.setdefault(segment, {})
+        node[_SOURCE] = source_name
+
+    def resolve(self, url):
+        """Get the source with the longest matching prefix, in O(path depth)"""
+        host, segments = self._split(url)
+        root = self.hosts.get(host)
+        if root is None:
+            return None
+
+        node = root
+        match = node.get(_SOURCE)
+        for segment in segments:
+            node = node.get(segment)
+            if node is None:
+                break
+            match = node.get(_SOURCE, match)
+
+        # Fall back to the host when only one source lives on it
+        if match is None and len(root[_SOURCES]) == 1:
+            match = next(iter(root[_SOURCES]))
+        return match